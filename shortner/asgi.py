@@ -2,6 +2,8 @@
 ASGI config for shortner project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The live click stream (url_app.live) is served directly; every other
+request goes to Django.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +15,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'shortner.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from url_app.live import LIVE_PATH, live_application  # noqa: E402 (needs Django set up)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == LIVE_PATH:
+        await live_application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -82,9 +82,54 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASSWORD'),
         'HOST': 'localhost',
         'PORT': '5432',
+        # Keep connections open between requests so warmed-up workers reuse them
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Cache configuration. The default local-memory cache is per process;
+# point this at a shared cache (Redis/Memcached) to share redirect
+# lookups and invalidations between workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    }
+}
+
+# Redirect lookups (short code -> target) are cached for this many seconds.
+# Deleting, deactivating or extending a link only invalidates the cache of
+# the worker that made the change, so with the per-process default cache
+# other workers can serve the old target for up to this long. Raise it
+# once CACHES points at a shared cache.
+REDIRECT_CACHE_ALIAS = 'default'
+REDIRECT_CACHE_TIMEOUT = int(os.getenv('REDIRECT_CACHE_TIMEOUT', '5'))
+
+# Optional snapshot file of active short codes (see export_snapshot). When
+# set, redirects are resolved from the memory-mapped file first; the file
+# is re-checked for replacement every REDIRECT_SNAPSHOT_CHECK_INTERVAL seconds.
+# Deleted codes are only recorded for the snapshot overlay while this is set,
+# so set it for every process that deletes links, not just the workers.
+REDIRECT_SNAPSHOT_PATH = os.getenv('REDIRECT_SNAPSHOT_PATH', '')
+REDIRECT_SNAPSHOT_CHECK_INTERVAL = float(os.getenv('REDIRECT_SNAPSHOT_CHECK_INTERVAL', '1'))
+
+# Warm-up: preload the top-N most clicked active URLs when a worker starts.
+# Enable it only for server processes (it also runs for manage.py commands).
+REDIRECT_WARMUP_ON_STARTUP = os.getenv('REDIRECT_WARMUP_ON_STARTUP', 'False') == 'True'
+REDIRECT_WARMUP_TOP_N = int(os.getenv('REDIRECT_WARMUP_TOP_N', '10000'))
+REDIRECT_WARMUP_TIME_BUDGET = float(os.getenv('REDIRECT_WARMUP_TIME_BUDGET', '10'))
+# Preloaded entries outlive REDIRECT_CACHE_TIMEOUT so they are still there
+# when the worker starts serving; like any cached target they may be stale
+# in other workers for up to this long after a change
+REDIRECT_WARMUP_CACHE_TIMEOUT = int(os.getenv('REDIRECT_WARMUP_CACHE_TIMEOUT', '60'))
+
+# Live click stream (SSE, served under ASGI): seconds between counter
+# ticks, and click events buffered per watcher before they are dropped
+# and only counted
+LIVE_STREAM_INTERVAL = float(os.getenv('LIVE_STREAM_INTERVAL', '1'))
+LIVE_STREAM_BUFFER_SIZE = int(os.getenv('LIVE_STREAM_BUFFER_SIZE', '100'))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -101,6 +146,17 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Click analytics storage: 'rows' (ClickAnalytics table) or 'segments'
+# (append-only columnar segment files under CLICK_SEGMENT_DIR)
+CLICK_ANALYTICS_BACKEND = os.getenv('CLICK_ANALYTICS_BACKEND', 'rows')
+CLICK_SEGMENT_DIR = os.getenv('CLICK_SEGMENT_DIR', str(BASE_DIR / 'var' / 'click_segments'))
+CLICK_SEGMENT_FLUSH_ROWS = int(os.getenv('CLICK_SEGMENT_FLUSH_ROWS', '1000'))
+CLICK_SEGMENT_FLUSH_INTERVAL = float(os.getenv('CLICK_SEGMENT_FLUSH_INTERVAL', '5'))
+# Once this many segments of similar size (below CLICK_SEGMENT_COMPACT_ROWS
+# rows) exist, a background thread merges them into one (0 disables it)
+CLICK_SEGMENT_COMPACT_THRESHOLD = int(os.getenv('CLICK_SEGMENT_COMPACT_THRESHOLD', '16'))
+CLICK_SEGMENT_COMPACT_ROWS = int(os.getenv('CLICK_SEGMENT_COMPACT_ROWS', '100000'))
+
 # Internationalization
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
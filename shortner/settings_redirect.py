@@ -0,0 +1,28 @@
+"""
+Settings profile for redirect-only nodes.
+
+Serves ``/<short_code>/`` and nothing else. Admin, auth, sessions,
+messages, templates and DRF are left out, so workers only import what
+the redirect path needs. Use it with the regular entry points, e.g.::
+
+    DJANGO_SETTINGS_MODULE=shortner.settings_redirect gunicorn shortner.wsgi
+
+Redirects served here are not rate limited (RedirectView's DRF throttle
+is not installed).
+"""
+from .settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    'url_app',
+]
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+ROOT_URLCONF = 'shortner.urls_redirect'
+
+TEMPLATES = []
+
+AUTH_PASSWORD_VALIDATORS = []
@@ -0,0 +1,8 @@
+"""URLconf for redirect-only nodes (shortner.settings_redirect)"""
+from django.urls import path
+
+from url_app.redirects import redirect_view
+
+urlpatterns = [
+    path('<str:short_code>/', redirect_view, name='redirect'),
+]
@@ -0,0 +1,154 @@
+from django.db import DatabaseError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from datetime import timedelta
+from rest_framework.test import APIClient
+from rest_framework import status
+import threading
+from unittest.mock import patch
+from url_app import batch, cache
+from url_app.models import URL, ClickAnalytics, hash_admin_key
+
+class BatchOperationAPITest(TestCase):
+    """Test POST /api/urls/batch/"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.urls = [
+            URL.objects.create(
+                short_code=f"batch{i}",
+                original_url="https://example.com",
+                admin_hash=hash_admin_key(f"key{i}")
+            )
+            for i in range(3)
+        ]
+    
+    def post(self, data):
+        return self.client.post('/api/urls/batch/', data, format='json')
+    
+    def test_deactivate_reports_each_item(self):
+        """Test that only items with a matching admin key are updated"""
+        response = self.post({
+            'operation': 'deactivate',
+            'items': [
+                {'code': 'batch0', 'admin_key': 'key0'},
+                {'code': 'batch1', 'admin_key': 'wrong'},
+                {'code': 'missing', 'admin_key': 'key2'},
+            ]
+        })
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['succeeded'], 1)
+        self.assertEqual(
+            [r['status'] for r in response.data['results']],
+            ['ok', 'not_found', 'not_found']
+        )
+        self.assertFalse(URL.objects.get(short_code='batch0').is_active)
+        self.assertTrue(URL.objects.get(short_code='batch1').is_active)
+    
+    def test_extend(self):
+        """Test extending expiration and invalidating cached redirects"""
+        cache.get_redirect_target('batch2')
+        response = self.post({
+            'operation': 'extend',
+            'expires_in': 90,
+            'items': [{'code': 'batch2', 'admin_key': 'key2'}]
+        })
+        
+        self.assertEqual(response.data['succeeded'], 1)
+        expected = timezone.now() + timedelta(days=90)
+        self.assertAlmostEqual(
+            cache.get_redirect_target('batch2').expires_at, expected, delta=timedelta(minutes=1)
+        )
+    
+    def test_extend_requires_expires_in(self):
+        """Test validation of extend without expires_in"""
+        response = self.post({
+            'operation': 'extend',
+            'items': [{'code': 'batch0', 'admin_key': 'key0'}]
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_duplicate_codes_rejected(self):
+        """Test that a code listed twice fails validation instead of being merged"""
+        response = self.post({
+            'operation': 'deactivate',
+            'items': [
+                {'code': 'batch0', 'admin_key': 'wrong'},
+                {'code': 'batch0', 'admin_key': 'key0'},
+            ]
+        })
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('items', response.data)
+        self.assertTrue(URL.objects.get(short_code='batch0').is_active)
+    
+    def test_delete_removes_clicks(self):
+        """Test bulk delete of URLs and their analytics"""
+        ClickAnalytics.objects.create(url=self.urls[0], ip_address="192.168.1.1")
+        ClickAnalytics.objects.create(url=self.urls[1], ip_address="192.168.1.2")
+        
+        response = self.post({
+            'operation': 'delete',
+            'items': [
+                {'code': 'batch0', 'admin_key': 'key0'},
+                {'code': 'batch1', 'admin_key': 'key1'},
+            ]
+        })
+        
+        self.assertEqual(response.data['succeeded'], 2)
+        self.assertEqual(URL.objects.count(), 1)
+        self.assertEqual(ClickAnalytics.objects.count(), 0)
+    
+    def test_failed_chunk_reported_per_item(self):
+        """Test that a failing chunk is rolled back and reported without losing the others"""
+        real_update = batch.update_urls
+        
+        def update_urls(matched, **values):
+            real_update(matched, **values)
+            if 'batch1' in matched:
+                raise DatabaseError("simulated failure")
+        
+        with patch.object(batch, 'CHUNK_SIZE', 1), patch.object(batch, 'update_urls', update_urls):
+            response = self.post({
+                'operation': 'deactivate',
+                'items': [{'code': f'batch{i}', 'admin_key': f'key{i}'} for i in range(3)]
+            })
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['status'] for r in response.data['results']], ['ok', 'error', 'ok'])
+        self.assertFalse(URL.objects.get(short_code='batch0').is_active)
+        self.assertTrue(URL.objects.get(short_code='batch1').is_active)
+        self.assertFalse(URL.objects.get(short_code='batch2').is_active)
+
+class BatchDeleteRaceTest(TransactionTestCase):
+    """Test bulk deletes against clicks committed concurrently"""
+    
+    def test_click_committed_between_deletes(self):
+        """Test that a click committed mid-delete cannot break the delete's foreign key check"""
+        url = URL.objects.create(short_code="race1", original_url="https://example.com", admin_hash=hash_admin_key("k"))
+        
+        def click():
+            try:
+                with transaction.atomic():
+                    ClickAnalytics.objects.create(url_id=url.pk, ip_address="192.168.1.1")
+            except DatabaseError:
+                # The URL is gone by the time this click can commit
+                pass
+            finally:
+                connection.close()
+        
+        def commit_click_after_clicks_delete(execute, sql, params, many, context):
+            result = execute(sql, params, many, context)
+            if sql.startswith(f'DELETE FROM "{ClickAnalytics._meta.db_table}"'):
+                clicker = threading.Thread(target=click)
+                clicker.start()
+                # Without the row lock the click commits here; with it, it waits
+                clicker.join(0.5)
+            return result
+        
+        with connection.execute_wrapper(commit_click_after_clicks_delete):
+            batch.delete_urls({url.short_code: url.pk})
+        
+        self.assertFalse(URL.objects.filter(pk=url.pk).exists())
+        self.assertEqual(ClickAnalytics.objects.count(), 0)
@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.test import SimpleTestCase
+import os
+import subprocess
+import sys
+
+# Budgets for booting one redirect-node worker (shortner.settings_redirect).
+# Raise them deliberately when a change needs more; don't let them drift.
+MODULE_BUDGET = 600
+IMPORT_TIME_BUDGET = float(os.getenv('IMPORT_TIME_BUDGET', '1.0'))  # seconds
+
+# Modules the redirect path must not pull in
+FORBIDDEN_MODULES = (
+    'rest_framework', 'django.contrib.admin', 'django.contrib.auth',
+    'django.contrib.sessions', 'django.contrib.messages',
+    'url_app.views', 'url_app.serializers', 'validators', 'numpy',
+)
+
+BOOT_WORKER = (
+    "from django.core.wsgi import get_wsgi_application\n"
+    "get_wsgi_application()\n"
+    "from django.urls import resolve\n"
+    "resolve('/abc123/')\n"
+)
+
+
+def parse_importtime(output):
+    """Return ``{module: cumulative seconds}`` and the total import time"""
+    modules = {}
+    total = 0
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(cumulative) / 1e6
+        # Top-level imports are indented by exactly one space
+        if not name.startswith('  '):
+            total += int(cumulative) / 1e6
+    return modules, total
+
+
+def measure_boot(settings_module):
+    """Boot a worker in a fresh interpreter under ``-X importtime``"""
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE=settings_module,
+        REDIRECT_WARMUP_ON_STARTUP='False',
+    )
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', BOOT_WORKER],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return parse_importtime(result.stderr)
+
+
+class RedirectNodeImportTest(SimpleTestCase):
+    """Import-time budget for redirect-only workers"""
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.modules, cls.total = measure_boot('shortner.settings_redirect')
+    
+    def test_module_count_within_budget(self):
+        """Test a redirect worker imports no more modules than budgeted"""
+        self.assertLessEqual(len(self.modules), MODULE_BUDGET)
+    
+    def test_import_time_within_budget(self):
+        """Test a redirect worker boots within the import-time budget"""
+        self.assertLessEqual(self.total, IMPORT_TIME_BUDGET)
+    
+    def test_unneeded_modules_not_imported(self):
+        """Test the redirect path skips DRF, admin, auth and analytics libraries"""
+        self.assertIn('url_app.redirects', self.modules)
+        imported = [
+            name for name in self.modules
+            if any(name == m or name.startswith(f"{m}.") for m in FORBIDDEN_MODULES)
+        ]
+        self.assertEqual(imported, [])
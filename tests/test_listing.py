@@ -0,0 +1,63 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from datetime import timedelta
+from rest_framework.test import APIClient
+from rest_framework import status
+from url_app.models import URL
+import secrets
+
+class URLListingAPITest(TestCase):
+    """Test GET /api/urls/ listing with keyset pagination"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        staff = User.objects.create_user('staff', password='pw', is_staff=True)
+        self.client.force_authenticate(staff)
+        for i in range(5):
+            URL.objects.create(
+                short_code=f"list{i}",
+                original_url=f"https://{'example.com' if i % 2 else 'WWW.Other.org'}/{i}",
+                admin_hash=secrets.token_urlsafe(32),
+                click_count=i * 10
+            )
+        URL.objects.filter(short_code='list0').update(expires_at=timezone.now() - timedelta(days=1))
+    
+    def test_requires_staff(self):
+        """Test that anonymous users cannot list URLs"""
+        response = APIClient().get('/api/urls/')
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+    
+    def test_keyset_pages(self):
+        """Test walking every page with next_cursor"""
+        codes = []
+        cursor = None
+        while True:
+            params = {'page_size': 2}
+            if cursor:
+                params['cursor'] = cursor
+            response = self.client.get('/api/urls/', params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('admin_hash', response.data['results'][0])
+            codes.extend(r['short_code'] for r in response.data['results'])
+            cursor = response.data['next_cursor']
+            if not cursor:
+                break
+        
+        self.assertEqual(codes, ['list4', 'list3', 'list2', 'list1', 'list0'])
+    
+    def test_filters(self):
+        """Test status, click and host filters"""
+        response = self.client.get('/api/urls/', {'status': 'expired'})
+        self.assertEqual([r['short_code'] for r in response.data['results']], ['list0'])
+        
+        response = self.client.get('/api/urls/', {'min_clicks': 20, 'max_clicks': 30})
+        self.assertEqual([r['short_code'] for r in response.data['results']], ['list3', 'list2'])
+        
+        response = self.client.get('/api/urls/', {'host': 'www.other.org', 'status': 'active'})
+        self.assertEqual([r['short_code'] for r in response.data['results']], ['list4', 'list2'])
+    
+    def test_invalid_cursor(self):
+        """Test that a malformed cursor is rejected"""
+        response = self.client.get('/api/urls/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,114 @@
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from url_app.analytics import build_click_event, record_click, record_clicks
+from url_app.live import Broker, broker, live_application
+from url_app.models import URL, Browser, DeviceType, OperatingSystem, Referrer, UserAgent, hash_admin_key
+import asyncio
+
+class LiveStream:
+    """Drive the live ASGI app with an in-memory client"""
+    
+    def __init__(self, query_string):
+        self.scope = {
+            'type': 'http', 'method': 'GET', 'path': '/api/urls/live/',
+            'query_string': query_string.encode(),
+        }
+        self.incoming = asyncio.Queue()
+        self.messages = []
+        self.received = asyncio.Event()
+    
+    async def receive(self):
+        return await self.incoming.get()
+    
+    async def send(self, message):
+        self.messages.append(message)
+        self.received.set()
+    
+    @property
+    def status(self):
+        return self.messages[0]['status']
+    
+    @property
+    def body(self):
+        return b''.join(m.get('body', b'') for m in self.messages[1:])
+    
+    async def wait_for(self, text, timeout=5):
+        async def poll():
+            while text not in self.body:
+                self.received.clear()
+                await self.received.wait()
+        await asyncio.wait_for(poll(), timeout)
+
+@override_settings(LIVE_STREAM_INTERVAL=0.05, LIVE_STREAM_BUFFER_SIZE=100)
+class LiveStreamTest(TransactionTestCase):
+    """Test the live click stream"""
+    
+    def setUp(self):
+        # Flushed dimension rows must not linger in the id caches
+        for model in (UserAgent, Referrer, DeviceType, Browser, OperatingSystem):
+            self.addCleanup(model.objects.clear_cache)
+        self.url = URL.objects.create(
+            short_code="live1",
+            original_url="https://example.com/live",
+            admin_hash=hash_admin_key("live-key")
+        )
+    
+    async def test_streams_clicks_and_ticks(self):
+        """Test clicks are pushed to watchers along with counter ticks"""
+        client = LiveStream("code=live1&admin_key=live-key")
+        task = asyncio.ensure_future(live_application(client.scope, client.receive, client.send))
+        await client.wait_for(b': connected')
+        self.assertEqual(client.status, 200)
+        self.assertEqual(dict(client.messages[0]['headers'])[b'content-type'], b'text/event-stream')
+        self.assertEqual(broker.subscriber_count(self.url.pk), 1)
+        
+        meta = {'HTTP_USER_AGENT': 'Mozilla/5.0 (Windows NT 10.0) Chrome/120.0', 'REMOTE_ADDR': '10.0.0.1'}
+        await sync_to_async(record_click)(build_click_event(self.url.pk, meta))
+        await client.wait_for(b'event: click')
+        await client.wait_for(b'"clicks":1')
+        self.assertIn(b'"browser":"Chrome"', client.body)
+        
+        await client.incoming.put({'type': 'http.disconnect'})
+        await asyncio.wait_for(task, 5)
+        self.assertEqual(broker.subscriber_count(self.url.pk), 0)
+    
+    async def test_requires_valid_admin_key(self):
+        """Test the stream is only opened for the link's admin key"""
+        for query, expected in (("code=live1&admin_key=wrong", 404), ("code=live1", 400)):
+            client = LiveStream(query)
+            await live_application(client.scope, client.receive, client.send)
+            self.assertEqual(client.status, expected)
+    
+    async def test_rolled_back_clicks_are_not_published(self):
+        """Test watchers only see clicks once their transaction commits"""
+        subscription = broker.subscribe(self.url.pk, buffer_size=10)
+        self.addCleanup(broker.unsubscribe, subscription)
+        event = build_click_event(self.url.pk, {})
+        
+        def write(commit):
+            with transaction.atomic():
+                record_clicks([event, event])
+                transaction.set_rollback(not commit)
+        
+        await sync_to_async(write)(False)
+        await asyncio.sleep(0)
+        self.assertEqual(subscription.drain(), [])
+        self.assertEqual(subscription.tick()['clicks'], 0)
+        
+        await sync_to_async(write)(True)
+        await asyncio.sleep(0)
+        self.assertEqual(len(subscription.drain()), 2)
+        self.assertEqual(subscription.tick()['clicks'], 2)
+    
+    async def test_slow_watcher_is_coalesced(self):
+        """Test events beyond a watcher's buffer are dropped but still counted"""
+        local = Broker()
+        subscription = local.subscribe(self.url.pk, buffer_size=2)
+        event = build_click_event(self.url.pk, {})
+        local.publish([event] * 5)
+        await asyncio.sleep(0)
+        
+        self.assertEqual(len(subscription.drain()), 2)
+        self.assertEqual(subscription.tick(), {'clicks': 5, 'dropped': 3, 'total': 5})
+        self.assertEqual(subscription.tick(), {'clicks': 0, 'dropped': 0, 'total': 5})
@@ -1,7 +1,8 @@
 from django.test import TestCase
 from django.utils import timezone
 from datetime import timedelta
-from url_app.models import URL, ClickAnalytics
+from unittest.mock import patch
+from url_app.models import URL, ClickAnalytics, DimensionManager, UserAgent, Browser, DeviceType, OperatingSystem
 import secrets
 
 class URLModelTest(TestCase):
@@ -51,6 +52,21 @@ class URLModelTest(TestCase):
             expires_at=timezone.now() + timedelta(days=5)
         )
         self.assertEqual(url.days_remaining, 5)
+    
+    def test_check_admin_key(self):
+        """Test admin keys are stored as digests and checked against them"""
+        url = URL(original_url="https://example.com")
+        url.set_admin_key("secret-key")
+        url.save()
+        self.addCleanup(URL._verified_keys.clear)
+        
+        self.assertEqual(len(url.admin_hash), 64)
+        self.assertTrue(url.check_admin_key("secret-key"))
+        self.assertIn(url.admin_hash, URL._verified_keys)
+        # Served from the verified-key cache the second time
+        self.assertTrue(url.check_admin_key("secret-key"))
+        self.assertFalse(url.check_admin_key("wrong-key"))
+        self.assertFalse(url.check_admin_key("sécret"))
 
 class ClickAnalyticsTest(TestCase):
     """Test cases for ClickAnalytics model"""
@@ -67,16 +83,54 @@ class ClickAnalyticsTest(TestCase):
         analytics = ClickAnalytics.objects.create(
             url=self.url,
             ip_address="192.168.1.1",
-            user_agent="Test Browser",
-            device_type="desktop",
-            browser="Chrome"
+            user_agent_id=UserAgent.objects.resolve("Test Browser"),
+            device_type_id=DeviceType.objects.resolve("desktop"),
+            browser_id=Browser.objects.resolve("Chrome")
         )
         self.assertEqual(analytics.url, self.url)
         self.assertEqual(analytics.ip_address, "192.168.1.1")
+        self.assertEqual(analytics.browser.value, "Chrome")
     
     def test_analytics_relationship(self):
         """Test relationship between URL and analytics"""
         ClickAnalytics.objects.create(url=self.url, ip_address="192.168.1.1")
         ClickAnalytics.objects.create(url=self.url, ip_address="192.168.1.2")
         
-        self.assertEqual(self.url.clicks.count(), 2)
\ No newline at end of file
+        self.assertEqual(self.url.clicks.count(), 2)
+    
+    def test_dimension_values_are_interned(self):
+        """Test that repeated strings share one dimension row"""
+        first = UserAgent.objects.resolve("Mozilla/5.0")
+        second = UserAgent.objects.resolve("Mozilla/5.0")
+        
+        self.assertEqual(first, second)
+        self.assertEqual(UserAgent.objects.count(), 1)
+        self.assertIsNone(UserAgent.objects.resolve(None))
+    
+    def test_dimension_cache_is_per_model(self):
+        """Test that each dimension model caches its own ids"""
+        with self.captureOnCommitCallbacks(execute=True):
+            browser_id = Browser.objects.resolve("Unknown")
+            os_id = OperatingSystem.objects.resolve("Unknown")
+        self.addCleanup(Browser.objects.clear_cache)
+        self.addCleanup(OperatingSystem.objects.clear_cache)
+        
+        with self.assertNumQueries(0):
+            self.assertEqual(Browser.objects.resolve("Unknown"), browser_id)
+            self.assertEqual(OperatingSystem.objects.resolve("Unknown"), os_id)
+        self.assertIsNot(Browser.objects._ids, OperatingSystem.objects._ids)
+    
+    def test_dimension_cache_evicts_least_recently_used(self):
+        """Test that a full id cache drops only its least recently used entry"""
+        self.addCleanup(UserAgent.objects.clear_cache)
+        with self.captureOnCommitCallbacks(execute=True):
+            ids = [UserAgent.objects.resolve(f"agent-{i}") for i in range(3)]
+        
+        with patch.object(DimensionManager, 'cache_size', 3):
+            UserAgent.objects.resolve("agent-0")
+            with self.captureOnCommitCallbacks(execute=True):
+                UserAgent.objects.resolve("agent-3")
+        
+        self.assertEqual(list(UserAgent.objects._ids), ["agent-2", "agent-0", "agent-3"])
+        with self.assertNumQueries(0):
+            self.assertEqual(UserAgent.objects.resolve("agent-0"), ids[0])
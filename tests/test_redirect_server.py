@@ -0,0 +1,154 @@
+from django.test import TransactionTestCase
+from django.utils import timezone
+from datetime import timedelta
+from rest_framework.test import APIClient
+from url_app import cache
+from url_app.models import URL, ClickAnalytics, Browser, DeviceType, OperatingSystem, Referrer, UserAgent
+from url_app.analytics import build_click_event
+from url_app.redirect_server import MAX_HEADERS, RedirectApp, handle_connection, write_clicks
+from functools import partial
+import asyncio
+
+class RedirectServerTest(TransactionTestCase):
+    """Test the standalone redirect server against RedirectView"""
+    
+    def setUp(self):
+        cache.get_cache().clear()
+        # Flushed dimension rows must not linger in the id caches
+        for model in (UserAgent, Referrer, DeviceType, Browser, OperatingSystem):
+            self.addCleanup(model.objects.clear_cache)
+        self.app = RedirectApp(workers=2)
+        self.app.start()
+        self.addCleanup(self.app.stop)
+    
+    def request(self, path, method='GET'):
+        messages = []
+        
+        async def send(message):
+            messages.append(message)
+        
+        asyncio.run(self.app({
+            'type': 'http',
+            'method': method,
+            'path': path,
+            'query_string': b'',
+            'headers': [(b'user-agent', b'Mozilla/5.0 Firefox/120.0')],
+            'client': ('192.168.1.1', 1234),
+        }, None, send))
+        start, body = messages
+        return start['status'], dict(start['headers']), body['body']
+    
+    def test_redirect_records_click(self):
+        """Test 302 and click ingest through the shared pipeline"""
+        url = URL.objects.create(
+            short_code="srv123",
+            original_url="https://example.com/path",
+            admin_hash="testhash"
+        )
+        
+        status, headers, _ = self.request('/srv123/')
+        self.app.ingest.drain()
+        
+        self.assertEqual(status, 302)
+        self.assertEqual(headers[b'location'], b"https://example.com/path")
+        url.refresh_from_db()
+        self.assertEqual(url.click_count, 1)
+        self.assertEqual(ClickAnalytics.objects.get(url=url).browser.value, 'Firefox')
+    
+    def test_matches_redirect_view(self):
+        """Test that 404 and 410 responses match RedirectView byte for byte"""
+        URL.objects.create(
+            short_code="old123",
+            original_url="https://example.com/old",
+            admin_hash="testhash",
+            expires_at=timezone.now() - timedelta(days=1)
+        )
+        client = APIClient()
+        
+        for path, expected in (('/old123/', 410), ('/missing/', 404)):
+            status, headers, body = self.request(path)
+            response = client.get(path)
+            self.assertEqual(status, expected)
+            self.assertEqual(status, response.status_code)
+            self.assertEqual(headers[b'content-type'], response['Content-Type'].encode())
+            self.assertEqual(body, response.content)
+    
+    def test_append_slash_and_methods(self):
+        """Test the APPEND_SLASH redirect, OPTIONS and unsupported methods"""
+        status, headers, _ = self.request('/srv123')
+        self.assertEqual(status, 301)
+        self.assertEqual(headers[b'location'], b'/srv123/')
+        
+        client = APIClient()
+        for method in ('POST', 'OPTIONS'):
+            status, headers, body = self.request('/srv123/', method=method)
+            response = client.generic(method, '/srv123/')
+            self.assertEqual(status, response.status_code)
+            self.assertEqual(headers[b'allow'], response['Allow'].encode())
+            self.assertEqual(body, response.content)
+    
+    def test_decoded_paths(self):
+        """Test that ASGI paths are used as decoded, like CommonMiddleware and RedirectView"""
+        URL.objects.create(short_code="pct%41", original_url="https://example.com", admin_hash="testhash")
+        
+        status, headers, _ = self.request('/abc€')
+        self.assertEqual(status, 301)
+        self.assertEqual(headers[b'location'], APIClient().get('/abc€')['Location'].encode())
+        self.assertEqual(headers[b'location'], b'/abc%E2%82%AC/')
+        
+        # Sent as /pct%2541/; the ASGI server has already decoded it once
+        status, headers, _ = self.request('/pct%41/')
+        self.assertEqual(status, 302)
+    
+    def raw_request(self, data):
+        """Send raw bytes to the built-in HTTP server and read until it closes"""
+        async def run():
+            server = await asyncio.start_server(partial(handle_connection, self.app), '127.0.0.1', 0)
+            async with server:
+                reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+                writer.write(data)
+                await writer.drain()
+                response = await asyncio.wait_for(reader.read(), 5)
+                writer.close()
+                return response
+        
+        return asyncio.run(run())
+    
+    def test_requests_with_bodies_are_refused(self):
+        """Test that bodies are refused and the connection closed, so they can't be read as requests"""
+        smuggled = b'GET /missing/ HTTP/1.1\r\nhost: x\r\n\r\n'
+        for framing in (
+            b'transfer-encoding: chunked\r\n\r\n' + b'%x\r\n' % len(smuggled) + smuggled + b'\r\n0\r\n\r\n',
+            b'content-length: %d\r\n\r\n' % len(smuggled) + smuggled,
+        ):
+            response = self.raw_request(b'GET /missing/ HTTP/1.1\r\nhost: x\r\n' + framing)
+            
+            self.assertTrue(response.startswith(b'HTTP/1.1 400 Bad Request\r\n'))
+            self.assertIn(b'connection: close', response)
+            self.assertEqual(response.count(b'HTTP/1.1 '), 1)
+    
+    def test_header_limits(self):
+        """Test that oversized request lines and too many headers are refused"""
+        headers = b''.join(b'x-h%d: v\r\n' % i for i in range(MAX_HEADERS + 1))
+        response = self.raw_request(b'GET /missing/ HTTP/1.1\r\n' + headers + b'\r\n')
+        self.assertTrue(response.startswith(b'HTTP/1.1 431 '))
+        
+        response = self.raw_request(b'GET /' + b'a' * 10000 + b'/ HTTP/1.1\r\n\r\n')
+        self.assertTrue(response.startswith(b'HTTP/1.1 414 '))
+        
+        response = self.raw_request(b'GET /missing/ HTTP/1.1\r\ncontent-length: 0\r\nconnection: close\r\n\r\n')
+        self.assertTrue(response.startswith(b'HTTP/1.1 404 '))
+    
+    def test_clicks_on_deleted_urls_are_dropped(self):
+        """Test that a click on a deleted URL does not lose the rest of the batch"""
+        url = URL.objects.create(short_code="keep12", original_url="https://example.com", admin_hash="testhash")
+        gone = URL.objects.create(short_code="gone12", original_url="https://example.com", admin_hash="testhash")
+        meta = {'HTTP_USER_AGENT': 'Mozilla/5.0 Firefox/120.0', 'REMOTE_ADDR': '192.168.1.1'}
+        events = [build_click_event(url.pk, meta), build_click_event(gone.pk, meta), build_click_event(url.pk, meta)]
+        gone.delete()
+        
+        write_clicks(events)
+        
+        url.refresh_from_db()
+        self.assertEqual(url.click_count, 2)
+        self.assertEqual(ClickAnalytics.objects.filter(url=url).count(), 2)
@@ -0,0 +1,196 @@
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from datetime import timedelta
+from rest_framework.test import APIClient
+from url_app import analytics
+from url_app.models import URL, ClickAnalytics, hash_admin_key
+from url_app.segments import EncodedBatch, Segment, SegmentStore
+import os
+import tempfile
+import time
+
+def make_event(url_id, clicked_at, **fields):
+    event = {
+        'url_id': url_id,
+        'clicked_at': clicked_at,
+        'ip_address': '10.0.0.1',
+        'user_agent': 'Mozilla/5.0 (iPhone) Mobile Safari',
+        'referrer': None,
+        'device_type': 'mobile',
+        'browser': 'Safari',
+        'operating_system': 'iOS',
+        'country': 'Unknown',
+        'city': 'Unknown',
+    }
+    event.update(fields)
+    return event
+
+class SegmentStoreTest(TestCase):
+    """Test cases for columnar click segments"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = SegmentStore(self.tmp.name, flush_rows=1000)
+        self.now = timezone.now()
+    
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+    
+    def test_segment_round_trip(self):
+        """Test that a written segment decodes to the same columns"""
+        events = [
+            make_event(1, self.now - timedelta(seconds=10)),
+            make_event(2, self.now - timedelta(seconds=5), browser='Chrome', referrer='https://google.com/'),
+            make_event(1, self.now),
+        ]
+        path = os.path.join(self.tmp.name, 'test.seg')
+        EncodedBatch.from_events(events).write(path)
+        
+        segment = Segment(path)
+        self.assertEqual(len(segment), 3)
+        # Rows are sorted by URL id, keeping arrival order per URL
+        self.assertEqual(list(segment.column('url_id')), [1, 1, 2])
+        self.assertEqual(segment.labels('browser', slice(0, 3)), ['Safari', 'Safari', 'Chrome'])
+        expected = [int(e['clicked_at'].timestamp() * 1000) for e in (events[0], events[2], events[1])]
+        self.assertEqual(list(segment.timestamps()), expected)
+        self.assertEqual(segment.rows(2), slice(2, 3))
+        self.assertIsNone(segment.rows(3))
+    
+    def test_stats_across_segments_and_pending(self):
+        """Test aggregation over flushed segments and the pending buffer"""
+        self.store.extend([
+            make_event(1, self.now - timedelta(days=1)),
+            make_event(1, self.now - timedelta(days=1), device_type='desktop', browser='Chrome'),
+            make_event(2, self.now),
+        ])
+        self.store.flush()
+        self.store.append(make_event(1, self.now, device_type='', browser='Firefox'))
+        
+        stats = self.store.stats(1, self.now)
+        
+        self.assertEqual(stats['clicks_by_day'][self.now.date().isoformat()], 1)
+        self.assertEqual(stats['clicks_by_day'][(self.now - timedelta(days=1)).date().isoformat()], 2)
+        self.assertEqual(stats['device_distribution'], {'mobile': 1, 'desktop': 1, 'Unknown': 1})
+        self.assertEqual(stats['browser_distribution'], {'Safari': 1, 'Chrome': 1, 'Firefox': 1})
+        self.assertEqual(len(stats['recent_clicks']), 3)
+        self.assertEqual(stats['recent_clicks'][0]['browser'], 'Firefox')
+
+    def test_idle_events_are_flushed(self):
+        """Test pending events are written once flush_interval passes, without new clicks"""
+        store = SegmentStore(self.tmp.name, flush_rows=1000, flush_interval=0.05)
+        self.addCleanup(store.close)
+        store.append(make_event(1, self.now))
+        
+        deadline = time.monotonic() + 5
+        while not store.segments() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        
+        self.assertEqual(len(store.segments()), 1)
+        self.assertEqual(len(store.segments()[0]), 1)
+    
+    def test_compaction_merges_small_segments(self):
+        """Test small segments are merged in the background without changing query results"""
+        store = SegmentStore(self.tmp.name, flush_rows=1000, compact_threshold=4)
+        self.addCleanup(store.close)
+        for i in range(3):
+            store.extend([make_event(1, self.now - timedelta(minutes=i)), make_event(i + 2, self.now)])
+            store.flush()
+        self.assertEqual(len(store.segments()), 3)
+        before = store.stats(1, self.now)
+        
+        # The fourth flush reaches the threshold and wakes the compaction thread
+        store.extend([make_event(1, self.now + timedelta(seconds=1), browser='Chrome')])
+        store.flush()
+        deadline = time.monotonic() + 5
+        while len(os.listdir(self.tmp.name)) != 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        
+        segments = store.segments()
+        self.assertEqual(len(segments), 1)
+        self.assertEqual(len(segments[0]), 7)
+        self.assertEqual(len(os.listdir(self.tmp.name)), 2)  # segment + lock file
+        after = store.stats(1, self.now)
+        self.assertEqual(after['browser_distribution'], {'Safari': 3, 'Chrome': 1})
+        self.assertEqual(after['recent_clicks'][1:], before['recent_clicks'])
+    
+    def test_compaction_is_tiered(self):
+        """Test a compacted segment is not rewritten together with new small ones"""
+        store = SegmentStore(self.tmp.name, compact_threshold=4)
+        large = [make_event(i % 3, self.now - timedelta(seconds=i), browser=f"B{i % 5}") for i in range(20)]
+        EncodedBatch.from_events(large).write(os.path.join(self.tmp.name, 'clicks-0-1.seg'))
+        for i in range(4):
+            EncodedBatch.from_events([make_event(1, self.now, city=f"C{i}")]).write(
+                os.path.join(self.tmp.name, f'clicks-{i + 1}-1.seg')
+            )
+        before = store.stats(1, self.now)
+        
+        store.compact()
+        
+        self.assertEqual(sorted(len(segment) for segment in store.segments()), [4, 20])
+        self.assertEqual(store.stats(1, self.now), before)
+        merged = min(store.segments(), key=len)
+        self.assertEqual(sorted(event['city'] for event in merged.events(slice(0, 4))), ['C0', 'C1', 'C2', 'C3'])
+    
+    def test_replaced_segments_are_ignored(self):
+        """Test readers skip segments a compaction replaced but did not remove yet"""
+        self.store.extend([make_event(1, self.now)])
+        first = self.store.flush()
+        EncodedBatch.from_events([make_event(1, self.now)]).write(
+            os.path.join(self.tmp.name, 'clicks-99999999999999999999-1.seg'),
+            replaces=[os.path.basename(first)]
+        )
+        
+        self.assertEqual(sum(self.store.stats(1, self.now)['clicks_by_day'].values()), 1)
+    
+    def test_segments_hold_no_file_descriptors(self):
+        """Test querying many segments leaves no files open"""
+        store = SegmentStore(self.tmp.name, compact_threshold=0)
+        for i in range(50):
+            store.extend([make_event(i % 5, self.now)])
+            store.flush()
+        open_fds = len(os.listdir('/proc/self/fd'))
+        
+        stats = store.stats(1, self.now)
+        
+        self.assertEqual(len(store.segments()), 50)
+        self.assertEqual(sum(stats['clicks_by_day'].values()), 10)
+        self.assertEqual(len(os.listdir('/proc/self/fd')), open_fds)
+
+class SegmentBackendAPITest(TestCase):
+    """Test the redirect and stats endpoints with the segments backend"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            CLICK_ANALYTICS_BACKEND='segments',
+            CLICK_SEGMENT_DIR=self.tmp.name
+        )
+        self.settings_override.enable()
+        analytics._segment_store = None
+        self.client = APIClient()
+    
+    def tearDown(self):
+        store = analytics.get_segment_store()
+        store.flush()
+        store.close()
+        analytics._segment_store = None
+        self.settings_override.disable()
+        self.tmp.cleanup()
+    
+    def test_clicks_go_to_segments(self):
+        """Test that clicks are stored as segments instead of rows"""
+        url = URL.objects.create(
+            short_code="seg123",
+            original_url="https://example.com",
+            admin_hash=hash_admin_key("seghash")
+        )
+        
+        self.client.get(f'/{url.short_code}/', HTTP_USER_AGENT='Mozilla/5.0 Chrome/120.0')
+        response = self.client.get(
+            f'/api/urls/stats/?code={url.short_code}&admin_key=seghash'
+        )
+        
+        self.assertEqual(ClickAnalytics.objects.count(), 0)
+        self.assertEqual(response.data['browser_distribution'], {'Chrome': 1})
+        self.assertEqual(len(response.data['recent_clicks']), 1)
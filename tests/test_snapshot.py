@@ -0,0 +1,128 @@
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from datetime import timedelta
+from io import StringIO
+from url_app import cache
+from url_app.batch import delete_urls, update_urls
+from url_app.models import URL, URLTombstone
+from url_app.snapshot import Snapshot, SnapshotLookup
+import os
+import tempfile
+
+class SnapshotTest(TestCase):
+    """Test cases for the short code snapshot file"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'codes.snap')
+        snapshot_settings = override_settings(REDIRECT_SNAPSHOT_PATH=self.path)
+        snapshot_settings.enable()
+        self.addCleanup(snapshot_settings.disable)
+        for code in ('bbb', 'aaa', 'ccc', 'Zed'):
+            URL.objects.create(
+                short_code=code,
+                original_url=f"https://example.com/{code}",
+                admin_hash=f"key-{code}"
+            )
+        URL.objects.create(
+            short_code='old',
+            original_url="https://example.com/old",
+            admin_hash="key-old",
+            expires_at=timezone.now() - timedelta(days=1)
+        )
+        URL.objects.create(
+            short_code='off',
+            original_url="https://example.com/off",
+            admin_hash="key-off",
+            is_active=False
+        )
+    
+    def export(self):
+        call_command('export_snapshot', output=self.path, stdout=StringIO())
+    
+    def test_export_and_lookup(self):
+        """Test that only active, unexpired codes are exported and found"""
+        self.export()
+        snapshot = Snapshot(self.path)
+        
+        self.assertEqual(len(snapshot), 4)
+        for code in ('aaa', 'bbb', 'ccc', 'Zed'):
+            target = snapshot.get(code)
+            self.assertEqual(target.original_url, f"https://example.com/{code}")
+            self.assertEqual(target.pk, URL.objects.get(short_code=code).pk)
+        for code in ('old', 'off', 'missing', 'aa', 'aaaa', 'x' * 20):
+            self.assertIsNone(snapshot.get(code))
+    
+    def test_overlay_and_swap(self):
+        """Test new codes via the overlay and picking up a new export"""
+        self.export()
+        lookup = SnapshotLookup(self.path, check_interval=0, overlay_interval=0)
+        self.assertIsNotNone(lookup.get('aaa'))
+        
+        URL.objects.create(short_code='new', original_url="https://example.com/new", admin_hash="key-new")
+        with self.assertNumQueries(2):
+            self.assertEqual(lookup.get('new').original_url, "https://example.com/new")
+        
+        URL.objects.filter(short_code='aaa').delete()
+        self.export()
+        self.assertIsNone(lookup.get('aaa'))
+        self.assertIsNotNone(lookup.get('new'))
+    
+    def test_changes_after_export(self):
+        """Test that deactivate, extend and delete after an export are not served from the file"""
+        self.export()
+        lookup = SnapshotLookup(self.path, check_interval=0, overlay_interval=0)
+        matched = dict(URL.objects.filter(short_code__in=['aaa', 'bbb']).values_list('short_code', 'pk'))
+        expires_at = timezone.now() + timedelta(days=90)
+        
+        update_urls({'aaa': matched['aaa']}, is_active=False)
+        update_urls({'bbb': matched['bbb']}, expires_at=expires_at)
+        delete_urls({'ccc': URL.objects.get(short_code='ccc').pk})
+        URL.objects.get(short_code='Zed').delete()
+        
+        self.assertFalse(lookup.get('aaa').is_active)
+        self.assertAlmostEqual(lookup.get('bbb').expires_at, expires_at, delta=timedelta(seconds=1))
+        self.assertIsNone(lookup.get('ccc'))
+        self.assertIsNone(lookup.get('Zed'))
+    
+    def test_overlay_overflow_falls_back(self):
+        """Test that lookups stop trusting the file when too many codes changed"""
+        self.export()
+        lookup = SnapshotLookup(self.path, check_interval=0, overlay_interval=0, overlay_size=2)
+        URL.objects.get(short_code='aaa').delete()
+        
+        self.assertIsNone(lookup.get('aaa'))
+        self.assertIsNone(lookup.get('bbb'))
+    
+    def test_export_prunes_tombstones(self):
+        """Test that tombstones older than the replaced snapshot are removed"""
+        URLTombstone.objects.create(short_code='gone', deleted_at=timezone.now() - timedelta(days=1))
+        self.export()
+        URLTombstone.objects.create(short_code='recent')
+        self.export()
+        
+        self.assertEqual(list(URLTombstone.objects.values_list('short_code', flat=True)), ['recent'])
+    
+    def test_no_tombstones_without_snapshots(self):
+        """Test that deletes leave no tombstones while snapshots are not in use"""
+        with override_settings(REDIRECT_SNAPSHOT_PATH=''):
+            URL.objects.get(short_code='aaa').delete()
+            delete_urls({'bbb': URL.objects.get(short_code='bbb').pk})
+        self.assertFalse(URLTombstone.objects.exists())
+        
+        URL.objects.get(short_code='ccc').delete()
+        self.assertEqual(list(URLTombstone.objects.values_list('short_code', flat=True)), ['ccc'])
+    
+    def test_redirect_uses_snapshot(self):
+        """Test that redirects resolve from the snapshot without a lookup query"""
+        self.export()
+        with override_settings(REDIRECT_SNAPSHOT_PATH=self.path):
+            cache.get_snapshot_lookup().check_interval = 3600
+            cache.get_snapshot_lookup().overlay_interval = 3600
+            cache.get_redirect_target('bbb')
+            with self.assertNumQueries(0):
+                target = cache.get_redirect_target('bbb')
+        
+        self.assertEqual(target.original_url, "https://example.com/bbb")
@@ -1,8 +1,8 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
-from url_app.models import URL, ClickAnalytics
+from url_app.models import URL, ClickAnalytics, hash_admin_key
 import json
 
 class URLShortenerAPITest(TestCase):
@@ -32,6 +32,23 @@ class URLShortenerAPITest(TestCase):
         # Check URL was created in database
         self.assertEqual(URL.objects.count(), 1)
     
+    def test_admin_key_stored_as_digest(self):
+        """Test only the digest of the admin key is stored and exposed nowhere"""
+        response = self.client.post(
+            '/api/urls/',
+            data=json.dumps({"url": "https://example.com"}),
+            content_type='application/json'
+        )
+        admin_key = response.data['admin_key']
+        url = URL.objects.get(short_code=response.data['short_code'])
+        self.assertEqual(url.admin_hash, hash_admin_key(admin_key))
+        self.assertNotEqual(url.admin_hash, admin_key)
+        
+        response = self.client.get(f'/api/urls/stats/?code={url.short_code}&admin_key={admin_key}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('admin_hash', response.data['url_info'])
+        self.assertIn(f'admin_key={admin_key}', response.data['url_info']['stats_url'])
+    
     def test_create_short_url_invalid(self):
         """Test creating URL with invalid data"""
         # Missing URL
@@ -75,7 +92,7 @@ class URLShortenerAPITest(TestCase):
         url = URL.objects.create(
             short_code="test123",
             original_url="https://example.com",
-            admin_hash="testhash123",
+            admin_hash=hash_admin_key("testhash123"),
             click_count=3
         )
         
@@ -84,7 +101,7 @@ class URLShortenerAPITest(TestCase):
         ClickAnalytics.objects.create(url=url, ip_address="192.168.1.2")
         
         response = self.client.get(
-            f'/api/urls/stats/?code={url.short_code}&admin_key={url.admin_hash}'
+            f'/api/urls/stats/?code={url.short_code}&admin_key=testhash123'
         )
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -96,7 +113,7 @@ class URLShortenerAPITest(TestCase):
         url = URL.objects.create(
             short_code="test123",
             original_url="https://example.com",
-            admin_hash="correctkey"
+            admin_hash=hash_admin_key("correctkey")
         )
         
         response = self.client.get(
@@ -110,12 +127,69 @@ class URLShortenerAPITest(TestCase):
         url = URL.objects.create(
             short_code="test123",
             original_url="https://example.com",
-            admin_hash="testhash123"
+            admin_hash=hash_admin_key("testhash123")
         )
         
         response = self.client.delete(
-            f'/api/urls/delete/?code={url.short_code}&admin_key={url.admin_hash}'
+            f'/api/urls/delete/?code={url.short_code}&admin_key=testhash123'
         )
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(URL.objects.count(), 0)
\ No newline at end of file
+        self.assertEqual(URL.objects.count(), 0)
+    
+    def test_stats_distributions(self):
+        """Test stats aggregation over tracked clicks"""
+        url = URL.objects.create(
+            short_code="test123",
+            original_url="https://example.com",
+            admin_hash=hash_admin_key("testhash123")
+        )
+        
+        self.client.get(f'/{url.short_code}/', HTTP_USER_AGENT='Mozilla/5.0 (iPhone) Mobile Safari')
+        self.client.get(f'/{url.short_code}/', HTTP_USER_AGENT='Mozilla/5.0 Chrome/120.0')
+        
+        response = self.client.get(
+            f'/api/urls/stats/?code={url.short_code}&admin_key=testhash123'
+        )
+        
+        self.assertEqual(response.data['device_distribution'], {'mobile': 1, 'desktop': 1})
+        self.assertEqual(response.data['browser_distribution'], {'Safari': 1, 'Chrome': 1})
+        self.assertEqual(sum(response.data['clicks_by_day'].values()), 2)
+        self.assertEqual(response.data['recent_clicks'][0]['browser'], 'Chrome')
+
+
+@override_settings(ROOT_URLCONF='shortner.urls_redirect')
+class RedirectNodeTest(TestCase):
+    """Test the lean redirect view used by redirect-only nodes"""
+    
+    def test_redirect_matches_full_stack(self):
+        """Test redirect, 404, 410, 405 and OPTIONS responses match RedirectView"""
+        URL.objects.create(
+            short_code="lean1",
+            original_url="https://example.com/lean",
+            admin_hash="lean-key"
+        )
+        URL.objects.create(
+            short_code="lean2",
+            original_url="https://example.com/off",
+            admin_hash="lean-key-2",
+            is_active=False
+        )
+        
+        responses = {}
+        for urlconf in ('shortner.urls', 'shortner.urls_redirect'):
+            with self.settings(ROOT_URLCONF=urlconf):
+                responses[urlconf] = [
+                    self.client.get(f"/{code}/") for code in ("lean1", "lean2", "missing")
+                ] + [
+                    self.client.post("/lean1/"),
+                    self.client.options("/lean1/")
+                ]
+        
+        for full, lean in zip(responses['shortner.urls'], responses['shortner.urls_redirect']):
+            self.assertEqual(lean.status_code, full.status_code)
+            self.assertEqual(lean.content, full.content)
+            self.assertEqual(lean.get('Location'), full.get('Location'))
+            self.assertEqual(lean.get('Allow'), full.get('Allow'))
+        self.assertEqual(URL.objects.get(short_code="lean1").click_count, 2)
+        self.assertEqual(ClickAnalytics.objects.count(), 2)
@@ -0,0 +1,99 @@
+from django.db import OperationalError, connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from datetime import timedelta
+from url_app import cache
+from url_app.models import URL
+from url_app.warmup import _query_budget, warm_up
+from unittest.mock import patch
+import secrets
+import time
+
+class WarmupTest(TestCase):
+    """Test cases for redirect cache warm-up"""
+    
+    def setUp(self):
+        cache.get_cache().clear()
+        for code, clicks in (('hot', 90), ('warm', 9), ('cold', 1)):
+            URL.objects.create(
+                short_code=code,
+                original_url=f"https://example.com/{code}",
+                admin_hash=secrets.token_urlsafe(32),
+                click_count=clicks
+            )
+        URL.objects.create(
+            short_code='gone',
+            original_url="https://example.com/gone",
+            admin_hash=secrets.token_urlsafe(32),
+            expires_at=timezone.now() - timedelta(days=1),
+            click_count=1000
+        )
+        cache.get_cache().clear()
+    
+    def test_preloads_top_urls(self):
+        """Test that the most clicked active URLs are cached"""
+        report = warm_up(top_n=2, time_budget=10, coverage=True)
+        
+        self.assertEqual(report['urls_loaded'], 2)
+        self.assertEqual(report['clicks_total'], 100)
+        self.assertAlmostEqual(report['coverage'], 0.99)
+        self.assertFalse(report['budget_exhausted'])
+        self.assertIsNotNone(cache.get_cache().get(cache.cache_key('hot')))
+        self.assertIsNone(cache.get_cache().get(cache.cache_key('cold')))
+        self.assertIsNone(cache.get_cache().get(cache.cache_key('gone')))
+        
+        with self.assertNumQueries(0):
+            target = cache.get_redirect_target('hot')
+        self.assertEqual(target.original_url, "https://example.com/hot")
+    
+    def test_boot_skips_click_total(self):
+        """Test that warm-up only sums clicks over all URLs when coverage is asked for"""
+        report = warm_up(top_n=2, time_budget=10)
+        
+        self.assertEqual(report['urls_loaded'], 2)
+        self.assertIsNone(report['clicks_total'])
+        self.assertIsNone(report['coverage'])
+    
+    def test_top_urls_use_index(self):
+        """Test that the top-N query reads the partial click count index"""
+        rows = URL.objects.filter(is_active=True, expires_at__gt=timezone.now()).order_by('-click_count')[:2]
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        
+        self.assertIn('url_active_clicks_idx', rows.explain())
+    
+    def test_query_budget_cancels_slow_queries(self):
+        """Test that a warm-up query still running at the deadline is cancelled"""
+        start = time.monotonic()
+        with self.assertRaises(OperationalError):
+            with _query_budget(start + 0.05):
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT pg_sleep(5)")
+        
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertTrue(URL.objects.filter(short_code='hot').exists())
+    
+    @override_settings(REDIRECT_CACHE_TIMEOUT=5, REDIRECT_WARMUP_CACHE_TIMEOUT=60)
+    def test_preloaded_entries_outlive_cache_timeout(self):
+        """Test that warmed codes are still cached once REDIRECT_CACHE_TIMEOUT has passed"""
+        warm_up(top_n=2, time_budget=10)
+        
+        later = time.time() + 6
+        with patch('django.core.cache.backends.locmem.time.time', return_value=later):
+            with self.assertNumQueries(0):
+                target = cache.get_redirect_target('hot')
+        self.assertEqual(target.original_url, "https://example.com/hot")
+    
+    def test_time_budget(self):
+        """Test that warm-up stops once the time budget is spent"""
+        report = warm_up(top_n=10, time_budget=0)
+        
+        self.assertTrue(report['budget_exhausted'])
+        self.assertIsNone(report['coverage'])
+    
+    def test_cache_invalidated_on_delete(self):
+        """Test that deleting a URL drops its cached redirect target"""
+        warm_up(top_n=10, time_budget=10)
+        URL.objects.get(short_code='hot').delete()
+        
+        self.assertIsNone(cache.get_redirect_target('hot'))
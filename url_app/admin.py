@@ -16,4 +16,6 @@ class URLAdmin(admin.ModelAdmin):
 class ClickAnalyticsAdmin(admin.ModelAdmin):
     list_display = ('url', 'clicked_at', 'country', 'device_type', 'browser')
     list_filter = ('clicked_at', 'country', 'device_type')
-    search_fields = ('url__short_code', 'ip_address')
\ No newline at end of file
+    list_select_related = ('url', 'device_type', 'browser')
+    search_fields = ('url__short_code', 'ip_address')
+    raw_id_fields = ('url', 'user_agent', 'referrer', 'device_type', 'browser', 'operating_system')
\ No newline at end of file
@@ -0,0 +1,177 @@
+# url_app/analytics.py
+import atexit
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import live
+from .models import Browser, ClickAnalytics, DeviceType, OperatingSystem, Referrer, UserAgent
+
+ROWS_BACKEND = 'rows'
+SEGMENTS_BACKEND = 'segments'
+
+BROWSER_MAPPING = {
+    'Chrome': 'Chrome',
+    'Firefox': 'Firefox',
+    'Safari': 'Safari',
+    'Edge': 'Edge',
+    'Opera': 'Opera'
+}
+
+OS_MAPPING = {
+    'Windows': 'Windows',
+    'Mac': 'macOS',
+    'Linux': 'Linux',
+    'Android': 'Android',
+    'iPhone': 'iOS',
+    'iPad': 'iOS'
+}
+
+_segment_store = None
+
+
+def parse_user_agent(user_agent):
+    """Simple device/browser/OS detection from a User-Agent string"""
+    device_type = 'desktop'
+    browser = 'Unknown'
+    os = 'Unknown'
+
+    if 'Mobile' in user_agent:
+        device_type = 'mobile'
+    elif 'Tablet' in user_agent:
+        device_type = 'tablet'
+
+    for key, value in BROWSER_MAPPING.items():
+        if key in user_agent:
+            browser = value
+            break
+
+    for key, value in OS_MAPPING.items():
+        if key in user_agent:
+            os = value
+            break
+
+    return device_type, browser, os
+
+
+def build_click_event(url_id, meta):
+    """Build a click event dict from a request META mapping"""
+    user_agent = meta.get('HTTP_USER_AGENT', '')
+    referrer = meta.get('HTTP_REFERER', '')
+    device_type, browser, os = parse_user_agent(user_agent)
+
+    return {
+        'url_id': url_id,
+        'clicked_at': timezone.now(),
+        'ip_address': meta.get('REMOTE_ADDR') or None,
+        'user_agent': user_agent[:500],
+        'referrer': referrer[:500] if referrer else None,
+        'device_type': device_type,
+        'browser': browser,
+        'operating_system': os,
+        'country': 'Unknown',
+        'city': 'Unknown',
+    }
+
+
+def get_backend():
+    return getattr(settings, 'CLICK_ANALYTICS_BACKEND', ROWS_BACKEND)
+
+
+def get_segment_store():
+    """Return the per-process segment store, creating it on first use"""
+    global _segment_store
+    if _segment_store is None:
+        from .segments import SegmentStore
+        _segment_store = SegmentStore(
+            settings.CLICK_SEGMENT_DIR,
+            flush_rows=settings.CLICK_SEGMENT_FLUSH_ROWS,
+            flush_interval=settings.CLICK_SEGMENT_FLUSH_INTERVAL,
+            compact_threshold=settings.CLICK_SEGMENT_COMPACT_THRESHOLD,
+            compact_rows=settings.CLICK_SEGMENT_COMPACT_ROWS
+        )
+        atexit.register(_segment_store.flush)
+    return _segment_store
+
+
+def record_click(event):
+    """Store a click event with the configured analytics backend"""
+    if get_backend() == SEGMENTS_BACKEND:
+        get_segment_store().append(event)
+    else:
+        ClickAnalytics.objects.create(**click_row_fields(event))
+    _publish([event])
+
+
+def record_clicks(events):
+    """Store a batch of click events with the configured analytics backend"""
+    if get_backend() == SEGMENTS_BACKEND:
+        get_segment_store().extend(events)
+    else:
+        ClickAnalytics.objects.bulk_create([ClickAnalytics(**click_row_fields(e)) for e in events])
+    _publish(events)
+
+
+def _publish(events):
+    # Watchers only see clicks once the caller's transaction commits, so a
+    # rolled-back batch never reaches the stream or its counters
+    transaction.on_commit(partial(live.broker.publish, events))
+
+
+def click_row_fields(event):
+    """ClickAnalytics field values for an event, with strings interned"""
+    return {
+        'url_id': event['url_id'],
+        'ip_address': event['ip_address'],
+        'user_agent_id': UserAgent.objects.resolve(event['user_agent']),
+        'referrer_id': Referrer.objects.resolve(event['referrer']),
+        'device_type_id': DeviceType.objects.resolve(event['device_type']),
+        'browser_id': Browser.objects.resolve(event['browser']),
+        'operating_system_id': OperatingSystem.objects.resolve(event['operating_system']),
+        'country': event['country'],
+        'city': event['city'],
+    }
+
+
+def get_click_stats(url_obj):
+    """Aggregate click analytics for a URL with the configured backend"""
+    now = timezone.now()
+    if get_backend() == SEGMENTS_BACKEND:
+        return get_segment_store().stats(url_obj.pk, now)
+
+    clicks = url_obj.clicks.all()
+
+    # Calculate clicks by day (last 7 days)
+    days = [(now - timedelta(days=i)).date() for i in range(7)]
+    per_day = dict(
+        clicks.filter(clicked_at__date__gte=days[-1])
+        .annotate(day=TruncDate('clicked_at'))
+        .values_list('day')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    clicks_by_day = {date.isoformat(): per_day.get(date, 0) for date in days}
+
+    return {
+        'clicks_by_day': clicks_by_day,
+        'device_distribution': _distribution(clicks, 'device_type__value'),
+        'browser_distribution': _distribution(clicks, 'browser__value'),
+        'recent_clicks': clicks.select_related(
+            'user_agent', 'referrer', 'device_type', 'browser', 'operating_system'
+        ).order_by('-clicked_at')[:20],
+    }
+
+
+def _distribution(clicks, field):
+    """Count clicks per dimension value, grouping blanks as 'Unknown'"""
+    distribution = {}
+    rows = clicks.values_list(field).annotate(count=Count('id')).order_by()
+    for value, count in rows:
+        key = value or 'Unknown'
+        distribution[key] = distribution.get(key, 0) + count
+    return distribution
@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class UrlAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'url_app'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        if settings.REDIRECT_WARMUP_ON_STARTUP:
+            from .warmup import warm_up_on_startup
+            warm_up_on_startup()
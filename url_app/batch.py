@@ -0,0 +1,108 @@
+# url_app/batch.py
+"""
+Set-based management operations over many short codes at once.
+
+Items are authorized and applied in chunks: one SELECT resolves the
+codes of a chunk, then a single UPDATE or DELETE touches every
+authorized row. Deletes remove clicks with a bulk DELETE instead of
+collecting them through the ORM cascade. Each chunk commits on its own;
+a chunk that fails is rolled back and its items are reported as errors.
+"""
+import logging
+from datetime import timedelta
+
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from . import cache
+from .models import URL, ClickAnalytics, admin_key_matches
+from .snapshot import record_deletions
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+MAX_ITEMS = 10000
+OPERATIONS = ('extend', 'activate', 'deactivate', 'delete')
+
+OK = 'ok'
+NOT_FOUND = 'not_found'
+ERROR = 'error'
+
+
+def authorize(items):
+    """
+    Resolve ``(code, admin_key)`` pairs to ``{code: pk}`` for the pairs
+    whose admin key matches. Unknown codes and wrong keys are treated the
+    same, like the single-URL endpoints do.
+    """
+    keys = dict(items)
+    rows = URL.objects.filter(short_code__in=keys).values_list('short_code', 'pk', 'admin_hash')
+    return {code: pk for code, pk, admin_hash in rows if admin_key_matches(admin_hash, keys[code])}
+
+
+def delete_urls(matched):
+    """Delete URLs and their clicks with two bulk DELETE statements"""
+    ids = list(matched.values())
+    if not ids:
+        return
+    qn = connection.ops.quote_name
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Lock the URLs first: a click insert holds a key-share lock on its
+        # URL row, so clicks either commit before this and are deleted
+        # below, or wait and then fail their foreign key check
+        cursor.execute(
+            f"SELECT id FROM {qn(URL._meta.db_table)} WHERE id = ANY(%s) ORDER BY id FOR UPDATE", [ids]
+        )
+        cursor.execute(
+            f"DELETE FROM {qn(ClickAnalytics._meta.db_table)} WHERE url_id = ANY(%s)", [ids]
+        )
+        cursor.execute(
+            f"DELETE FROM {qn(URL._meta.db_table)} WHERE id = ANY(%s)", [ids]
+        )
+        record_deletions(list(matched))
+    cache.invalidate(*matched)
+
+
+def update_urls(matched, **values):
+    """Apply one UPDATE to every matched URL"""
+    if not matched:
+        return
+    URL.objects.filter(pk__in=matched.values()).update(updated_at=timezone.now(), **values)
+    cache.invalidate(*matched)
+
+
+def run_batch(operation, items, expires_in=None):
+    """
+    Run ``operation`` (extend, activate, deactivate or delete) over
+    ``(code, admin_key)`` pairs with distinct codes and return one
+    result per pair, in order.
+    """
+    if operation not in OPERATIONS:
+        raise ValueError(f"Unknown batch operation: {operation}")
+    items = list(items)
+    if len({code for code, _ in items}) != len(items):
+        raise ValueError("Batch items must have distinct codes")
+    results = []
+    for start in range(0, len(items), CHUNK_SIZE):
+        chunk = items[start:start + CHUNK_SIZE]
+        try:
+            with transaction.atomic():
+                matched = authorize(chunk)
+                if operation == 'delete':
+                    delete_urls(matched)
+                elif operation == 'extend':
+                    update_urls(matched, expires_at=timezone.now() + timedelta(days=expires_in))
+                elif operation == 'activate':
+                    update_urls(matched, is_active=True)
+                else:
+                    update_urls(matched, is_active=False)
+        except DatabaseError:
+            logger.exception("Batch %s failed for %d items", operation, len(chunk))
+            results.extend({'code': code, 'status': ERROR} for code, _ in chunk)
+            continue
+
+        results.extend(
+            {'code': code, 'status': OK if code in matched else NOT_FOUND}
+            for code, _ in chunk
+        )
+    return results
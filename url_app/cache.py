@@ -0,0 +1,77 @@
+# url_app/cache.py
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from .models import URL
+
+KEY_PREFIX = 'redirect:'
+FIELDS = ('pk', 'original_url', 'expires_at', 'is_active')
+
+_snapshot_lookup = None
+
+
+class RedirectTarget(namedtuple('RedirectTarget', FIELDS)):
+    """The parts of a URL the redirect path needs"""
+    
+    @property
+    def is_expired(self):
+        return timezone.now() > self.expires_at
+
+
+def get_cache():
+    return caches[settings.REDIRECT_CACHE_ALIAS]
+
+
+def cache_key(short_code):
+    return f"{KEY_PREFIX}{short_code}"
+
+
+def get_snapshot_lookup():
+    """The per-process snapshot lookup, or None when no snapshot is configured"""
+    global _snapshot_lookup
+    if not settings.REDIRECT_SNAPSHOT_PATH:
+        return None
+    if _snapshot_lookup is None or _snapshot_lookup.path != settings.REDIRECT_SNAPSHOT_PATH:
+        from .snapshot import SnapshotLookup
+        _snapshot_lookup = SnapshotLookup(
+            settings.REDIRECT_SNAPSHOT_PATH,
+            check_interval=settings.REDIRECT_SNAPSHOT_CHECK_INTERVAL,
+            overlay_interval=settings.REDIRECT_SNAPSHOT_CHECK_INTERVAL
+        )
+    return _snapshot_lookup
+
+
+def get_redirect_target(short_code):
+    """
+    Look up a short code through the snapshot file (when configured) and
+    then the redirect cache, or None if unknown
+    """
+    snapshot = get_snapshot_lookup()
+    if snapshot is not None:
+        target = snapshot.get(short_code)
+        if target is not None:
+            return target
+    
+    cache = get_cache()
+    entry = cache.get(cache_key(short_code))
+    if entry is None:
+        entry = URL.objects.filter(short_code=short_code).values_list(*FIELDS).first()
+        if entry is None:
+            return None
+        cache.set(cache_key(short_code), tuple(entry), settings.REDIRECT_CACHE_TIMEOUT)
+    return RedirectTarget(*entry)
+
+
+def preload(rows, timeout=None):
+    """Store ``(short_code, pk, original_url, expires_at, is_active)`` rows"""
+    get_cache().set_many(
+        {cache_key(row[0]): tuple(row[1:]) for row in rows},
+        settings.REDIRECT_CACHE_TIMEOUT if timeout is None else timeout
+    )
+
+
+def invalidate(*short_codes):
+    get_cache().delete_many([cache_key(code) for code in short_codes])
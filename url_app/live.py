@@ -0,0 +1,238 @@
+# url_app/live.py
+"""
+Live click stream over Server-Sent Events.
+
+``GET /api/urls/live/?code=<short_code>&admin_key=<admin_key>`` keeps
+the connection open and pushes a ``click`` event for every click on the
+link, plus a ``tick`` event every LIVE_STREAM_INTERVAL seconds with the
+clicks counted since the previous tick.
+
+Clicks are published by the ingest functions in url_app.analytics to an
+in-process broker. Each event is encoded once and fanned out to every
+subscriber on the event loop, so watchers cost no database queries.
+Every subscriber has a bounded buffer; when a client falls behind, the
+click events that don't fit are dropped and only counted in the next
+tick (``dropped``). Watchers only see clicks ingested by the same
+process, so serve the stream from the processes that serve redirects.
+
+The stream needs an ASGI server; shortner/asgi.py routes LIVE_PATH here
+and everything else to Django.
+"""
+import asyncio
+import json
+import threading
+from collections import deque
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from .models import URL
+
+LIVE_PATH = '/api/urls/live/'
+CLICK_FIELDS = (
+    'ip_address', 'user_agent', 'referrer', 'country', 'city',
+    'device_type', 'browser', 'operating_system'
+)
+
+
+def _isoformat(value):
+    """Format a datetime the way DRF's DateTimeField does"""
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def format_event(name, data):
+    """Encode one SSE message"""
+    return f"event: {name}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode('utf-8')
+
+
+def encode_click(event):
+    payload = {'clicked_at': _isoformat(event['clicked_at'])}
+    payload.update((name, event.get(name)) for name in CLICK_FIELDS)
+    return format_event('click', payload)
+
+
+class Subscription:
+    """One watcher's bounded buffer and counters; used on its event loop only"""
+
+    def __init__(self, url_id, loop, buffer_size):
+        self.url_id = url_id
+        self.loop = loop
+        self.buffer_size = buffer_size
+        self.clicks = 0
+        self.dropped = 0
+        self.total = 0
+        self.closed = False
+        self._buffer = deque()
+        self._ready = asyncio.Event()
+
+    def push(self, message):
+        self.clicks += 1
+        self.total += 1
+        if len(self._buffer) < self.buffer_size:
+            self._buffer.append(message)
+        else:
+            self.dropped += 1
+        self._ready.set()
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    async def wait(self, timeout):
+        """Wait until something is buffered, the stream closes or ``timeout``"""
+        try:
+            await asyncio.wait_for(self._ready.wait(), max(timeout, 0))
+        except asyncio.TimeoutError:
+            pass
+
+    def drain(self):
+        """Return the buffered messages and clear the buffer"""
+        self._ready.clear()
+        messages = list(self._buffer)
+        self._buffer.clear()
+        return messages
+
+    def tick(self):
+        """Return the counters since the last tick and reset them"""
+        data = {'clicks': self.clicks, 'dropped': self.dropped, 'total': self.total}
+        self.clicks = self.dropped = 0
+        return data
+
+
+class Broker:
+    """In-process pub/sub of click events, keyed by URL id"""
+
+    def __init__(self):
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, url_id, buffer_size):
+        subscription = Subscription(url_id, asyncio.get_running_loop(), buffer_size)
+        with self._lock:
+            self._channels.setdefault(url_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            channel = self._channels.get(subscription.url_id)
+            if channel is not None:
+                channel.discard(subscription)
+                if not channel:
+                    del self._channels[subscription.url_id]
+
+    def subscriber_count(self, url_id):
+        return len(self._channels.get(url_id, ()))
+
+    def publish(self, events):
+        """Fan click events out to their subscribers; safe from any thread"""
+        if not self._channels:
+            return
+        by_loop = {}
+        with self._lock:
+            for event in events:
+                channel = self._channels.get(event['url_id'])
+                if not channel:
+                    continue
+                for loop in {subscription.loop for subscription in channel}:
+                    by_loop.setdefault(loop, []).append(event)
+        for loop, loop_events in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(self._fan_out, loop, loop_events)
+            except RuntimeError:
+                # The loop has been closed; its subscriptions go with it
+                pass
+
+    def _fan_out(self, loop, events):
+        for event in events:
+            message = encode_click(event)
+            with self._lock:
+                channel = list(self._channels.get(event['url_id'], ()))
+            for subscription in channel:
+                if subscription.loop is loop:
+                    subscription.push(message)
+
+
+broker = Broker()
+
+
+def authenticate(short_code, admin_key):
+    """Return the id of the URL the key administers, or None"""
+    close_old_connections()
+    url = URL.objects.only('pk', 'admin_hash').filter(short_code=short_code).first()
+    if url is None or not url.check_admin_key(admin_key):
+        return None
+    return url.pk
+
+
+async def json_response(send, status, data):
+    body = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def live_application(scope, receive, send):
+    """ASGI application serving the live click stream"""
+    if scope['method'] != 'GET':
+        await json_response(send, 405, {'detail': f'Method "{scope["method"]}" not allowed.'})
+        return
+
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    short_code = query.get('code', [''])[0]
+    admin_key = query.get('admin_key', [''])[0]
+    if not short_code or not admin_key:
+        await json_response(send, 400, {'error': 'Both code and admin_key parameters are required'})
+        return
+
+    url_id = await sync_to_async(authenticate)(short_code, admin_key)
+    if url_id is None:
+        await json_response(send, 404, {'detail': 'Not found.'})
+        return
+
+    interval = settings.LIVE_STREAM_INTERVAL
+    subscription = broker.subscribe(url_id, settings.LIVE_STREAM_BUFFER_SIZE)
+    watcher = asyncio.ensure_future(_close_on_disconnect(receive, subscription))
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': b': connected\n\n', 'more_body': True})
+
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time() + interval
+        while not subscription.closed:
+            await subscription.wait(next_tick - loop.time())
+            messages = subscription.drain()
+            if loop.time() >= next_tick:
+                messages.append(format_event('tick', subscription.tick()))
+                next_tick = loop.time() + interval
+            if messages and not subscription.closed:
+                await send({'type': 'http.response.body', 'body': b''.join(messages), 'more_body': True})
+    except OSError:
+        # The client went away mid-write
+        pass
+    finally:
+        broker.unsubscribe(subscription)
+        watcher.cancel()
+
+
+async def _close_on_disconnect(receive, subscription):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            subscription.close()
+            return
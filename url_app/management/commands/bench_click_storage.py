@@ -0,0 +1,139 @@
+import random
+import secrets
+import tempfile
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import override_settings
+from django.utils import timezone
+
+from url_app.analytics import ROWS_BACKEND, build_click_event, click_row_fields, get_click_stats
+from url_app.models import URL, Browser, ClickAnalytics, DeviceType, OperatingSystem, Referrer, UserAgent, hash_admin_key
+from url_app.segments import SegmentStore, block_cache
+
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148',
+    'Mozilla/5.0 (X11; Linux x86_64; rv:120.0) Gecko/20100101 Firefox/120.0',
+    'Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Mobile Safari/537.36',
+]
+
+REFERRERS = [
+    None,
+    'https://www.google.com/',
+    'https://twitter.com/',
+    'https://news.ycombinator.com/',
+    'https://www.reddit.com/r/programming/',
+]
+
+
+class Command(BaseCommand):
+    help = "Compare storage size and stats scan speed of the row table and click segments"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clicks', type=int, default=100000)
+        parser.add_argument('--urls', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--flush-rows', type=int, default=1000,
+                            help="Events per flushed segment, as a worker would write them")
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        now = timezone.now()
+
+        # Rows are inserted inside a transaction that is rolled back at the end
+        with transaction.atomic():
+            urls = URL.objects.bulk_create([
+                URL(short_code=f"b{i:08d}", original_url=f"https://example.com/{i}",
+                    admin_hash=hash_admin_key(secrets.token_urlsafe(32)))
+                for i in range(options['urls'])
+            ])
+            events = []
+            for i in range(options['clicks']):
+                event = build_click_event(rng.choice(urls).pk, {
+                    'HTTP_USER_AGENT': rng.choice(USER_AGENTS),
+                    'HTTP_REFERER': rng.choice(REFERRERS) or '',
+                    'REMOTE_ADDR': f"10.0.{rng.randrange(256)}.{rng.randrange(256)}",
+                })
+                event['clicked_at'] = now - timedelta(seconds=options['clicks'] - i)
+                events.append(event)
+
+            row_size = self._insert_rows(events)
+            target = urls[0]
+            row_time = self._time(options['repeat'], lambda: self._row_stats(target))
+
+            with tempfile.TemporaryDirectory() as directory:
+                flush_rows = options['flush_rows']
+                store = SegmentStore(directory, flush_rows=flush_rows, compact_threshold=0,
+                                     compact_rows=len(events) + 1)
+                start = time.perf_counter()
+                for offset in range(0, len(events), flush_rows):
+                    store.extend(events[offset:offset + flush_rows])
+                store.flush()
+                write_time = time.perf_counter() - start
+                segment_count = len(store.segments())
+                uncompacted_time = self._time(options['repeat'], lambda: self._cold_stats(store, target, now))
+
+                start = time.perf_counter()
+                store.compact()
+                compact_time = time.perf_counter() - start
+                segment_size = store.total_size()
+                segment_time = self._time(options['repeat'], lambda: self._cold_stats(store, target, now))
+                cached_time = self._time(options['repeat'], lambda: store.stats(target.pk, now))
+                store.close()
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"clicks: {len(events)} over {len(urls)} URLs")
+        self.stdout.write(f"rows:     {self._size(row_size):>12}  stats scan {row_time * 1000:8.1f} ms")
+        self.stdout.write(
+            f"segments: {'':>12}  stats scan {uncompacted_time * 1000:8.1f} ms"
+            f"  ({segment_count} segments written in {write_time * 1000:.1f} ms)"
+        )
+        self.stdout.write(
+            f"compacted:{self._size(segment_size):>12}  stats scan {segment_time * 1000:8.1f} ms"
+            f"  (compacted in {compact_time * 1000:.1f} ms, {cached_time * 1000:.1f} ms cached)"
+        )
+
+    def _insert_rows(self, events):
+        ClickAnalytics.objects.bulk_create(
+            [ClickAnalytics(**click_row_fields(e)) for e in events], batch_size=5000
+        )
+        if connection.vendor != 'postgresql':
+            return None
+        tables = [ClickAnalytics._meta.db_table] + [
+            model._meta.db_table for model in (UserAgent, Referrer, DeviceType, Browser, OperatingSystem)
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT SUM(pg_total_relation_size(t)) FROM unnest(%s::text[]) AS t", [tables]
+            )
+            return cursor.fetchone()[0]
+
+    def _row_stats(self, url_obj):
+        with override_settings(CLICK_ANALYTICS_BACKEND=ROWS_BACKEND):
+            stats = get_click_stats(url_obj)
+            list(stats['recent_clicks'])
+        return stats
+
+    def _cold_stats(self, store, url_obj, now):
+        # Decoded row groups are cached; measure reads from the files
+        block_cache.clear()
+        return store.stats(url_obj.pk, now)
+
+    def _time(self, repeat, func):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def _size(self, size):
+        if size is None:
+            return 'n/a'
+        return f"{size / 1024 / 1024:.2f} MiB"
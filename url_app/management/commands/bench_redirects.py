@@ -0,0 +1,95 @@
+import asyncio
+import io
+import secrets
+import time
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+
+from url_app.batch import delete_urls
+from url_app.models import URL, hash_admin_key
+from url_app.redirect_server import RedirectApp
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/120.0 Safari/537.36'
+
+
+class Command(BaseCommand):
+    help = "Compare redirect throughput of the Django stack and the standalone redirect server"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--urls', type=int, default=50)
+
+    def handle(self, *args, **options):
+        # The standalone server reads and writes from other threads, so the
+        # benchmark URLs are committed and removed again at the end
+        urls = URL.objects.bulk_create([
+            URL(short_code=f"r{i:08d}", original_url=f"https://example.com/{i}",
+                admin_hash=hash_admin_key(secrets.token_urlsafe(32)))
+            for i in range(options['urls'])
+        ])
+        codes = [url.short_code for url in urls]
+        paths = [f"/{codes[i % len(codes)]}/" for i in range(options['requests'])]
+        try:
+            django_rate = self._bench_django(paths)
+            server_rate, response_rate = self._bench_standalone(paths)
+        finally:
+            delete_urls({url.short_code: url.pk for url in urls})
+
+        # The Django path writes each click before responding, so the
+        # standalone rate counts the time until its queued clicks are written
+        self.stdout.write(f"requests: {len(paths)} over {len(codes)} URLs, clicks written")
+        self.stdout.write(f"django stack:      {django_rate:10.0f} req/s")
+        self.stdout.write(
+            f"standalone server: {server_rate:10.0f} req/s"
+            f"  ({server_rate / django_rate:.1f}x; responses alone {response_rate:.0f} req/s)"
+        )
+
+    def _bench_django(self, paths):
+        handler = WSGIHandler()
+        start = time.perf_counter()
+        for i, path in enumerate(paths):
+            environ = {
+                'REQUEST_METHOD': 'GET',
+                'PATH_INFO': path,
+                'SERVER_NAME': 'localhost',
+                'SERVER_PORT': '80',
+                'wsgi.url_scheme': 'http',
+                'wsgi.input': io.BytesIO(b''),
+                'HTTP_USER_AGENT': USER_AGENT,
+                # A fresh client address per request keeps the anon throttle out of the way
+                'REMOTE_ADDR': f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}",
+            }
+            response = handler(environ, lambda status, headers: None)
+            assert response.status_code == 302, response.status_code
+            response.close()
+        return len(paths) / (time.perf_counter() - start)
+
+    def _bench_standalone(self, paths):
+        app = RedirectApp()
+        app.start()
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                assert message['status'] == 302, message['status']
+
+        async def run():
+            for i, path in enumerate(paths):
+                await app({
+                    'type': 'http',
+                    'method': 'GET',
+                    'path': path,
+                    'query_string': b'',
+                    'headers': [(b'user-agent', USER_AGENT.encode())],
+                    'client': (f"10.0.0.{i & 255}", 0),
+                }, None, send)
+
+        try:
+            start = time.perf_counter()
+            asyncio.run(run())
+            responded = time.perf_counter() - start
+            app.ingest.drain()
+            elapsed = time.perf_counter() - start
+        finally:
+            app.stop()
+        return len(paths) / elapsed, len(paths) / responded
@@ -0,0 +1,26 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from url_app.snapshot import export_snapshot
+
+
+class Command(BaseCommand):
+    help = "Export active short codes to the memory-mapped snapshot file used by redirect workers"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default=settings.REDIRECT_SNAPSHOT_PATH,
+            help="Snapshot path (default: REDIRECT_SNAPSHOT_PATH)"
+        )
+
+    def handle(self, *args, **options):
+        if not options['output']:
+            raise CommandError("Set REDIRECT_SNAPSHOT_PATH or pass --output")
+        start = time.perf_counter()
+        count = export_snapshot(options['output'])
+        self.stdout.write(
+            f"Exported {count} short codes to {options['output']} "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from url_app.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = "Preload the most clicked active URLs into the redirect cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=None, help="Number of URLs to preload")
+        parser.add_argument('--budget', type=float, default=None, help="Time budget in seconds")
+
+    def handle(self, *args, **options):
+        report = warm_up(top_n=options['top'], time_budget=options['budget'], coverage=True)
+        for key, value in report.items():
+            self.stdout.write(f"{key}: {value}")
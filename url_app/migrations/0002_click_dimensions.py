@@ -0,0 +1,43 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def dimension_model(name):
+    return migrations.CreateModel(
+        name=name,
+        fields=[
+            ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ('value', models.CharField(max_length=500, unique=True)),
+        ],
+        options={
+            'abstract': False,
+        },
+    )
+
+
+def dimension_fk(name, model):
+    return migrations.AddField(
+        model_name='clickanalytics',
+        name=f'{name}_dim',
+        field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, to=f'url_app.{model}'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('url_app', '0001_initial'),
+    ]
+
+    operations = [
+        dimension_model('UserAgent'),
+        dimension_model('Referrer'),
+        dimension_model('DeviceType'),
+        dimension_model('Browser'),
+        dimension_model('OperatingSystem'),
+        dimension_fk('user_agent', 'useragent'),
+        dimension_fk('referrer', 'referrer'),
+        dimension_fk('device_type', 'devicetype'),
+        dimension_fk('browser', 'browser'),
+        dimension_fk('operating_system', 'operatingsystem'),
+    ]
@@ -0,0 +1,82 @@
+from django.db import migrations
+
+BATCH_SIZE = 10000
+
+# (text column on ClickAnalytics, dimension model)
+DIMENSIONS = [
+    ('user_agent', 'UserAgent'),
+    ('referrer', 'Referrer'),
+    ('device_type', 'DeviceType'),
+    ('browser', 'Browser'),
+    ('operating_system', 'OperatingSystem'),
+]
+
+
+def _id_batches(connection, table):
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT MIN(id), MAX(id) FROM {table}")
+        low, high = cursor.fetchone()
+    if low is None:
+        return
+    for start in range(low - 1, high, BATCH_SIZE):
+        yield start, start + BATCH_SIZE
+
+
+def populate_dimensions(apps, schema_editor):
+    """Intern click strings into dimension tables, one id range at a time"""
+    connection = schema_editor.connection
+    qn = connection.ops.quote_name
+    clicks = qn(apps.get_model('url_app', 'ClickAnalytics')._meta.db_table)
+
+    for start, end in _id_batches(connection, clicks):
+        with connection.cursor() as cursor:
+            for column, model in DIMENSIONS:
+                dimension = qn(apps.get_model('url_app', model)._meta.db_table)
+                cursor.execute(
+                    f"INSERT INTO {dimension} (value) "
+                    f"SELECT DISTINCT LEFT({qn(column)}, 500) FROM {clicks} "
+                    f"WHERE id > %s AND id <= %s AND {qn(column)} IS NOT NULL "
+                    f"ON CONFLICT (value) DO NOTHING",
+                    [start, end]
+                )
+                cursor.execute(
+                    f"UPDATE {clicks} SET {qn(column + '_dim_id')} = d.id "
+                    f"FROM {dimension} d "
+                    f"WHERE d.value = LEFT({clicks}.{qn(column)}, 500) "
+                    f"AND {clicks}.id > %s AND {clicks}.id <= %s",
+                    [start, end]
+                )
+
+
+def restore_text_columns(apps, schema_editor):
+    """Copy dimension values back into the click text columns"""
+    connection = schema_editor.connection
+    qn = connection.ops.quote_name
+    clicks = qn(apps.get_model('url_app', 'ClickAnalytics')._meta.db_table)
+
+    for start, end in _id_batches(connection, clicks):
+        with connection.cursor() as cursor:
+            for column, model in DIMENSIONS:
+                dimension = qn(apps.get_model('url_app', model)._meta.db_table)
+                cursor.execute(
+                    f"UPDATE {clicks} SET {qn(column)} = d.value "
+                    f"FROM {dimension} d "
+                    f"WHERE d.id = {clicks}.{qn(column + '_dim_id')} "
+                    f"AND {clicks}.id > %s AND {clicks}.id <= %s",
+                    [start, end]
+                )
+
+
+class Migration(migrations.Migration):
+
+    # Each batch commits on its own so large tables are not converted in
+    # one long transaction; the statements are idempotent and can be rerun
+    atomic = False
+
+    dependencies = [
+        ('url_app', '0002_click_dimensions'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_dimensions, restore_text_columns),
+    ]
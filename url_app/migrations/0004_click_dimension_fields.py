@@ -0,0 +1,18 @@
+from django.db import migrations
+
+FIELDS = ['user_agent', 'referrer', 'device_type', 'browser', 'operating_system']
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('url_app', '0003_populate_click_dimensions'),
+    ]
+
+    operations = [
+        migrations.RemoveField(model_name='clickanalytics', name=name)
+        for name in FIELDS
+    ] + [
+        migrations.RenameField(model_name='clickanalytics', old_name=f'{name}_dim', new_name=name)
+        for name in FIELDS
+    ]
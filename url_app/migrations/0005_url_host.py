@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('url_app', '0004_click_dimension_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='url',
+            name='host',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+    ]
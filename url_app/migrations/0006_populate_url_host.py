@@ -0,0 +1,44 @@
+from urllib.parse import urlsplit
+
+from django.db import migrations
+
+BATCH_SIZE = 2000
+
+
+def extract_host(url):
+    """Copy of url_app.models.extract_host as of this migration"""
+    try:
+        return (urlsplit(url).hostname or '')[:255]
+    except ValueError:
+        return ''
+
+
+def populate_host(apps, schema_editor):
+    """Fill URL.host from original_url, one primary key range at a time"""
+    URL = apps.get_model('url_app', 'URL')
+    last_pk = 0
+    while True:
+        batch = list(
+            URL.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', 'original_url')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for url in batch:
+            url.host = extract_host(url.original_url)
+        URL.objects.bulk_update(batch, ['host'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    # Each batch commits on its own so large tables are not rewritten in
+    # one long transaction
+    atomic = False
+
+    dependencies = [
+        ('url_app', '0005_url_host'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_host, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Indexes are built concurrently so large URL tables stay writable
+    atomic = False
+
+    dependencies = [
+        ('url_app', '0006_populate_url_host'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='url',
+            index=models.Index(fields=['-created_at', '-id'], name='url_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='url',
+            index=models.Index(fields=['host', '-created_at', '-id'], name='url_host_created_idx'),
+        ),
+    ]
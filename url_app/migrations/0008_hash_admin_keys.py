@@ -0,0 +1,58 @@
+import hashlib
+import re
+
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+# Keys have always been issued as 43-character URL-safe tokens, so a
+# 64-character hex value is a digest written by an earlier, interrupted run
+DIGEST_REGEX = r'^[0-9a-f]{64}$'
+
+
+def hash_admin_key(admin_key):
+    """Copy of url_app.models.hash_admin_key as of this migration"""
+    return hashlib.sha256(admin_key.encode('utf-8')).hexdigest()
+
+
+def _is_digest(value):
+    return re.match(DIGEST_REGEX, value) is not None
+
+
+def hash_admin_keys(apps, schema_editor):
+    """Replace plaintext admin keys with their digests, one primary key range at a time"""
+    URL = apps.get_model('url_app', 'URL')
+    last_pk = 0
+    while True:
+        batch = list(
+            URL.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', 'admin_hash')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        pending = [url for url in batch if not _is_digest(url.admin_hash)]
+        for url in pending:
+            url.admin_hash = hash_admin_key(url.admin_hash)
+        URL.objects.bulk_update(pending, ['admin_hash'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    # Each batch commits on its own so large tables are not rewritten in
+    # one long transaction
+    atomic = False
+
+    dependencies = [
+        ('url_app', '0007_url_listing_indexes'),
+    ]
+
+    operations = [
+        # Keys are checked after the short_code lookup, so the unique
+        # index on admin_hash is no longer needed
+        migrations.AlterField(
+            model_name='url',
+            name='admin_hash',
+            field=models.CharField(max_length=64),
+        ),
+        # Plaintext keys can't be recovered, so this is not reversed
+        migrations.RunPython(hash_admin_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Built concurrently so large URL tables stay writable
+    atomic = False
+
+    dependencies = [
+        ('url_app', '0009_url_updated_at_urltombstone'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='url',
+            index=models.Index(fields=['updated_at'], name='url_updated_idx'),
+        ),
+    ]
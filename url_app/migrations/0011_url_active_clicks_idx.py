@@ -0,0 +1,23 @@
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Built concurrently so large URL tables stay writable
+    atomic = False
+
+    dependencies = [
+        ('url_app', '0010_url_updated_idx'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='url',
+            index=models.Index(
+                condition=models.Q(('is_active', True)),
+                fields=['-click_count'],
+                name='url_active_clicks_idx',
+            ),
+        ),
+    ]
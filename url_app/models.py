@@ -1,7 +1,13 @@
 # url_app/models.py
-from django.db import models
+from django.db import models, transaction
+import hashlib
+import hmac
 import secrets
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from urllib.parse import urlsplit
 from django.utils import timezone
 
 def generate_short_code():
@@ -16,19 +22,84 @@ def default_expiry():
     """Default: 30 days from now"""
     return timezone.now() + timedelta(days=30)
 
+def extract_host(url):
+    """Lower-cased host name of a URL, used for indexed destination search"""
+    try:
+        return (urlsplit(url).hostname or '')[:255]
+    except ValueError:
+        return ''
+
+def hash_admin_key(admin_key):
+    """SHA-256 hex digest stored in URL.admin_hash instead of the admin key"""
+    return hashlib.sha256(admin_key.encode('utf-8')).hexdigest()
+
+def admin_key_matches(admin_hash, admin_key):
+    """Constant-time check of an admin key against a stored digest"""
+    return hmac.compare_digest(admin_hash.encode('ascii'), hash_admin_key(admin_key).encode('ascii'))
+
 class URL(models.Model):
     """Store shortened URLs"""
     short_code = models.CharField(max_length=10, unique=True, default=generate_short_code)
     original_url = models.URLField(max_length=2000)
-    admin_hash = models.CharField(max_length=64, unique=True)
+    # Digest of the admin key (see hash_admin_key); keys are checked after
+    # the short_code lookup, so this column needs no index
+    admin_hash = models.CharField(max_length=64)
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField(default=default_expiry)
     click_count = models.PositiveIntegerField(default=0)
     is_active = models.BooleanField(default=True)
+    host = models.CharField(max_length=255, blank=True, default='', editable=False)
+    # Bumped whenever the redirect target changes, so snapshot lookups can
+    # pick up changes made after an export; QuerySet.update() callers that
+    # touch original_url, expires_at or is_active must set it themselves
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    # Recently verified admin keys per stored digest, so dashboards polling
+    # stats skip the hashing: {admin_hash: (admin_key, expires)}
+    verified_key_ttl = 30
+    verified_key_cache_size = 10000
+    _verified_keys = {}
+    
+    class Meta:
+        indexes = [
+            # Keyset pagination over (created_at, id), optionally per host
+            models.Index(fields=['-created_at', '-id'], name='url_created_idx'),
+            models.Index(fields=['host', '-created_at', '-id'], name='url_host_created_idx'),
+            # Snapshot overlay refreshes scan recently changed URLs
+            models.Index(fields=['updated_at'], name='url_updated_idx'),
+            # Warm-up reads the most clicked active URLs without sorting the table
+            models.Index(fields=['-click_count'], name='url_active_clicks_idx', condition=models.Q(is_active=True)),
+        ]
     
     def __str__(self):
         return f"{self.short_code} → {self.original_url[:50]}"
     
+    def save(self, *args, **kwargs):
+        self.host = extract_host(self.original_url)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'original_url' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'host'}
+        super().save(*args, **kwargs)
+    
+    def set_admin_key(self, admin_key):
+        """Store the digest of ``admin_key``; the key itself is not kept"""
+        self.admin_hash = hash_admin_key(admin_key)
+    
+    def check_admin_key(self, admin_key):
+        """Constant-time check of ``admin_key`` against the stored digest"""
+        now = time.monotonic()
+        key = admin_key.encode('utf-8')
+        # Keyed by digest, so entries for deleted or re-created URLs can't match
+        hit = self._verified_keys.get(self.admin_hash)
+        if hit is not None and hit[1] > now and hmac.compare_digest(hit[0], key):
+            return True
+        if not admin_key_matches(self.admin_hash, admin_key):
+            return False
+        if len(self._verified_keys) >= self.verified_key_cache_size:
+            self._verified_keys.clear()
+        self._verified_keys[self.admin_hash] = (key, now + self.verified_key_ttl)
+        return True
+    
     @property
     def is_expired(self):
         return timezone.now() > self.expires_at
@@ -38,18 +109,104 @@ class URL(models.Model):
         remaining = self.expires_at - timezone.now()
         return remaining.days if remaining.days > 0 else 0
 
+class DimensionManager(models.Manager):
+    """Intern repeated strings, caching value -> id per process in an LRU"""
+    
+    cache_size = 10000
+    # Managers inherited from an abstract model are shallow copies of one
+    # instance, so the caches are kept per concrete model here
+    _caches = {}
+    _lock = threading.Lock()
+    
+    @property
+    def _ids(self):
+        return self._caches.setdefault(self.model._meta.label, OrderedDict())
+    
+    def resolve(self, value):
+        """Return the id of the row holding ``value``, creating it if needed"""
+        if value is None:
+            return None
+        value = value[:500]
+        ids = self._ids
+        with self._lock:
+            pk = ids.get(value)
+            if pk is not None:
+                ids.move_to_end(value)
+        if pk is not None:
+            return pk
+        pk = self.get_or_create(value=value)[0].pk
+        # Only cache ids once they are committed, so a rolled back
+        # transaction can never leave a dangling id in the cache
+        transaction.on_commit(lambda: self._remember(value, pk))
+        return pk
+    
+    def preload(self, limit):
+        """Fill the id cache with the ``limit`` most recently added values"""
+        rows = list(self.order_by('-pk').values_list('value', 'pk')[:limit])
+        for value, pk in rows:
+            self._remember(value, pk)
+        return len(rows)
+    
+    def _remember(self, value, pk):
+        ids = self._ids
+        with self._lock:
+            ids[value] = pk
+            ids.move_to_end(value)
+            while len(ids) > self.cache_size:
+                ids.popitem(last=False)
+    
+    def clear_cache(self):
+        self._ids.clear()
+
+class URLTombstone(models.Model):
+    """A deleted short code, kept until snapshots no longer contain it"""
+    short_code = models.CharField(max_length=10)
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+    
+    def __str__(self):
+        return f"{self.short_code} deleted at {self.deleted_at}"
+
+class Dimension(models.Model):
+    """A distinct string value referenced by click analytics"""
+    value = models.CharField(max_length=500, unique=True)
+    
+    objects = DimensionManager()
+    
+    class Meta:
+        abstract = True
+    
+    def __str__(self):
+        return self.value
+
+class UserAgent(Dimension):
+    pass
+
+class Referrer(Dimension):
+    pass
+
+class DeviceType(Dimension):
+    pass
+
+class Browser(Dimension):
+    pass
+
+class OperatingSystem(Dimension):
+    pass
+
 class ClickAnalytics(models.Model):
     """Track each click"""
     url = models.ForeignKey(URL, on_delete=models.CASCADE, related_name='clicks')
     clicked_at = models.DateTimeField(auto_now_add=True)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
-    user_agent = models.TextField(blank=True)
-    referrer = models.URLField(blank=True, null=True)
+    # Repeated strings live in dimension tables; the low-selectivity FKs are
+    # never filtered on directly, so they are left unindexed to keep ingest cheap
+    user_agent = models.ForeignKey(UserAgent, on_delete=models.PROTECT, null=True, blank=True, db_index=False)
+    referrer = models.ForeignKey(Referrer, on_delete=models.PROTECT, null=True, blank=True, db_index=False)
     country = models.CharField(max_length=100, blank=True)
     city = models.CharField(max_length=100, blank=True)
-    device_type = models.CharField(max_length=50, blank=True)
-    browser = models.CharField(max_length=100, blank=True)
-    operating_system = models.CharField(max_length=100, blank=True)
+    device_type = models.ForeignKey(DeviceType, on_delete=models.PROTECT, null=True, blank=True, db_index=False)
+    browser = models.ForeignKey(Browser, on_delete=models.PROTECT, null=True, blank=True, db_index=False)
+    operating_system = models.ForeignKey(OperatingSystem, on_delete=models.PROTECT, null=True, blank=True, db_index=False)
     
     class Meta:
         verbose_name_plural = "Click Analytics"
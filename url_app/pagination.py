@@ -0,0 +1,50 @@
+# url_app/pagination.py
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+
+class KeysetPagination:
+    """
+    Cursor pagination over ``(created_at, id)``, newest first.
+
+    The cursor encodes the sort key of the last row returned, so every
+    page is an index range scan no matter how deep the client pages.
+    """
+    page_size = 50
+    max_page_size = 200
+
+    def encode_cursor(self, obj):
+        raw = f"{obj.created_at.isoformat()}|{obj.pk}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+            created_at = parse_datetime(created_at)
+            pk = int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            created_at = None
+        if created_at is None:
+            raise ValidationError({'cursor': 'Invalid cursor'})
+        return created_at, pk
+
+    def paginate_queryset(self, queryset, cursor=None, page_size=None):
+        """Return ``(rows, next_cursor)`` for the page after ``cursor``"""
+        page_size = min(page_size or self.page_size, self.max_page_size)
+        queryset = queryset.order_by('-created_at', '-id')
+        if cursor:
+            created_at, pk = self.decode_cursor(cursor)
+            # The redundant created_at__lte bound lets the planner use the
+            # index as a range scan instead of evaluating the OR per row
+            queryset = queryset.filter(created_at__lte=created_at).filter(
+                Q(created_at__lt=created_at) | Q(id__lt=pk)
+            )
+        rows = list(queryset[:page_size + 1])
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            return rows, self.encode_cursor(rows[-1])
+        return rows, None
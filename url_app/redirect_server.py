@@ -0,0 +1,433 @@
+# url_app/redirect_server.py
+"""
+Minimal redirect server that runs outside Django's request stack.
+
+Answers ``GET /<code>/`` with the same 302/404/410 responses as
+RedirectView, without URL resolution, middleware or DRF. Short codes
+are resolved through the shared redirect cache (url_app.cache) on a
+thread pool, and clicks are queued and written in batches by a
+background thread through the same ingest functions RedirectView uses.
+Unlike RedirectView, requests are not rate limited.
+
+Run it with the built-in asyncio HTTP server::
+
+    python -m url_app.redirect_server --host 0.0.0.0 --port 8001
+
+or behind any ASGI server::
+
+    uvicorn url_app.redirect_server:application
+
+Only the standard library is imported at module level; Django is set
+up once when the app starts, with the redirect-node settings profile
+(shortner.settings_redirect) unless DJANGO_SETTINGS_MODULE says otherwise.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import queue
+import signal
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http import HTTPStatus
+from urllib.parse import unquote
+
+logger = logging.getLogger(__name__)
+
+HTML_CONTENT_TYPE = b'text/html; charset=utf-8'
+JSON_CONTENT_TYPE = b'application/json'
+ALLOWED_METHODS = ('GET', 'HEAD', 'OPTIONS')
+ALLOW_HEADER = (b'allow', ', '.join(ALLOWED_METHODS).encode('ascii'))
+# Limits of the built-in HTTP server, in line with gunicorn's defaults
+MAX_LINE_BYTES = 8190
+MAX_HEADERS = 100
+
+
+def setup():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'shortner.settings_redirect')
+    import django
+    django.setup()
+
+
+def json_response(status, data, headers=()):
+    """Render ``data`` the way DRF's JSONRenderer does"""
+    body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return status, [(b'content-type', JSON_CONTENT_TYPE), *headers], body
+
+
+def not_found():
+    return json_response(404, {'detail': 'Not found.'})
+
+
+def write_clicks(events):
+    """
+    Bump click counts and store click events in one transaction (runs on
+    the ingest thread). Clicks on URLs deleted since the redirect was
+    served are dropped instead of failing the whole batch.
+    """
+    from django.db import close_old_connections, transaction
+    from django.db.models import F
+
+    from .analytics import record_clicks
+    from .models import URL
+
+    close_old_connections()
+    counts = Counter(event['url_id'] for event in events)
+    with transaction.atomic():
+        # Lock the rows so the URLs can't be deleted before the clicks land
+        existing = set(
+            URL.objects.select_for_update().filter(pk__in=counts).order_by('pk').values_list('pk', flat=True)
+        )
+        for url_id, count in sorted(counts.items()):
+            if url_id in existing:
+                URL.objects.filter(pk=url_id).update(click_count=F('click_count') + count)
+        events = [event for event in events if event['url_id'] in existing]
+        if events:
+            record_clicks(events)
+
+
+class ClickIngest:
+    """Bounded queue of click events drained in batches by one thread"""
+
+    def __init__(self, write=write_clicks, batch_size=500, interval=0.5, max_pending=100000):
+        self.write = write
+        self.batch_size = batch_size
+        self.interval = interval
+        self.dropped = 0
+        self._queue = queue.Queue(max_pending)
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='click-ingest', daemon=True)
+        self._thread.start()
+
+    def submit(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def drain(self):
+        """Block until every submitted event has been written"""
+        self._queue.join()
+
+    def stop(self, timeout=5):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        from django.db import connections
+
+        running = True
+        while running:
+            events = [self._queue.get()]
+            deadline = time.monotonic() + self.interval
+            while len(events) < self.batch_size and events[-1] is not None:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    events.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            if events[-1] is None:
+                running = False
+                events.pop()
+            try:
+                if events:
+                    self.write(events)
+            except Exception:
+                logger.exception("Click ingest failed for %d events", len(events))
+            finally:
+                for _ in range(len(events) + (0 if running else 1)):
+                    self._queue.task_done()
+        connections.close_all()
+
+
+class RedirectApp:
+    """ASGI application serving short code redirects"""
+
+    def __init__(self, workers=8, local_ttl=1.0, local_size=100000):
+        self.workers = workers
+        self.local_ttl = local_ttl
+        self.local_size = local_size
+        self.ingest = ClickIngest()
+        self._targets = {}
+        self._executor = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """Set up Django and start the lookup pool and ingest thread"""
+        with self._start_lock:
+            if self._executor is not None:
+                return
+            setup()
+            from .analytics import build_click_event
+            from .cache import get_redirect_target
+            from .redirects import OPTIONS_METADATA, gone_payload
+            from django.utils.encoding import escape_uri_path, iri_to_uri
+            self._build_event = build_click_event
+            self._gone_payload = gone_payload
+            self._options_metadata = OPTIONS_METADATA
+            self._escape_uri_path = escape_uri_path
+            self._iri_to_uri = iri_to_uri
+            self._get_target = get_redirect_target
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='redirect-lookup')
+            self.ingest.start()
+
+    def stop(self):
+        with self._start_lock:
+            if self._executor is None:
+                return
+            self.ingest.stop()
+            # Run one task per pool thread so each closes its own connection
+            barrier = threading.Barrier(self.workers)
+            for future in [self._executor.submit(self._close_connections, barrier)
+                           for _ in range(self.workers)]:
+                future.result()
+            self._executor.shutdown()
+            self._executor = None
+
+    @staticmethod
+    def _close_connections(barrier):
+        from django.db import connections
+        connections.close_all()
+        barrier.wait()
+
+    def _lookup_sync(self, short_code):
+        from django.db import close_old_connections
+        close_old_connections()
+        return self._get_target(short_code)
+
+    async def lookup(self, short_code):
+        now = time.monotonic()
+        hit = self._targets.get(short_code)
+        if hit is not None and hit[1] > now:
+            return hit[0]
+        loop = asyncio.get_running_loop()
+        target = await loop.run_in_executor(self._executor, self._lookup_sync, short_code)
+        if target is not None:
+            if len(self._targets) >= self.local_size:
+                self._targets.clear()
+            self._targets[short_code] = (target, now + self.local_ttl)
+        return target
+
+    async def respond(self, method, path, query_string, meta):
+        """
+        Return ``(status, headers, body)`` for one request; ``path`` is
+        percent-decoded, as in an ASGI scope
+        """
+        code = path[1:]
+        if code.endswith('/'):
+            code = code[:-1]
+            if not code or '/' in code:
+                return not_found()
+        elif code and '/' not in code:
+            # Mirror CommonMiddleware's APPEND_SLASH redirect
+            location = self._escape_uri_path(f"{path}/") + (f"?{query_string}" if query_string else '')
+            return 301, [(b'content-type', HTML_CONTENT_TYPE), (b'location', location.encode('latin-1'))], b''
+        else:
+            return not_found()
+        if method not in ALLOWED_METHODS:
+            return json_response(
+                405, {'detail': f'Method "{method}" not allowed.'}, [ALLOW_HEADER]
+            )
+        if method == 'OPTIONS':
+            return json_response(200, self._options_metadata, [ALLOW_HEADER])
+
+        target = await self.lookup(code)
+        if target is None:
+            return not_found()
+
+        if target.is_expired or not target.is_active:
+            return json_response(410, self._gone_payload(target))
+
+        self.ingest.submit(self._build_event(target.pk, meta))
+        return 302, [
+            (b'content-type', HTML_CONTENT_TYPE),
+            (b'location', self._iri_to_uri(target.original_url).encode('latin-1')),
+        ], b''
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        self.start()
+        headers = {
+            name.decode('latin-1').lower(): value.decode('latin-1')
+            for name, value in scope.get('headers', [])
+        }
+        client = scope.get('client')
+        status, response_headers, body = await self.respond(
+            scope['method'], scope['path'],
+            scope.get('query_string', b'').decode('latin-1'),
+            {
+                'HTTP_USER_AGENT': headers.get('user-agent', ''),
+                'HTTP_REFERER': headers.get('referer', ''),
+                'REMOTE_ADDR': client[0] if client else '',
+            }
+        )
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': response_headers + [(b'content-length', str(len(body)).encode())],
+        })
+        await send({
+            'type': 'http.response.body',
+            'body': b'' if scope['method'] == 'HEAD' else body,
+        })
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self.start()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.stop()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+application = RedirectApp()
+
+
+class BadRequest(Exception):
+    """A request the built-in server refuses; the connection is closed"""
+
+    def __init__(self, status):
+        super().__init__(status)
+        self.status = status
+
+
+async def read_line(reader, status):
+    """Read one CRLF-terminated line, refusing lines over MAX_LINE_BYTES"""
+    try:
+        line = await reader.readuntil(b'\n')
+    except asyncio.LimitOverrunError:
+        raise BadRequest(status)
+    except asyncio.IncompleteReadError as e:
+        line = e.partial
+    if len(line) > MAX_LINE_BYTES + 2:
+        raise BadRequest(status)
+    return line
+
+
+async def read_request(reader):
+    """
+    Return ``(method, target, version, headers)`` for the next request,
+    or None at end of stream. Requests with a body are refused: the
+    redirect endpoints take none, and skipping a body this server does
+    not parse (e.g. chunked) would desync the connection behind a proxy.
+    """
+    request_line = await read_line(reader, 414)
+    if not request_line:
+        return None
+    try:
+        method, target, version = request_line.decode('latin-1').rstrip('\r\n').split(' ', 2)
+    except ValueError:
+        raise BadRequest(400)
+
+    headers = {}
+    while True:
+        line = await read_line(reader, 431)
+        if line in (b'\r\n', b'\n', b''):
+            break
+        if len(headers) == MAX_HEADERS:
+            raise BadRequest(431)
+        name, colon, value = line.decode('latin-1').partition(':')
+        if not colon or not name or name != name.strip():
+            raise BadRequest(400)
+        headers[name.lower()] = value.strip()
+
+    if 'transfer-encoding' in headers:
+        raise BadRequest(400)
+    if headers.get('content-length', '0') != '0':
+        raise BadRequest(400)
+    return method, target, version, headers
+
+
+async def handle_connection(app, reader, writer):
+    """Serve HTTP/1.1 requests on one connection, with keep-alive"""
+    peer = writer.get_extra_info('peername')
+    remote_addr = peer[0] if peer else ''
+    try:
+        while True:
+            try:
+                request = await read_request(reader)
+            except BadRequest as e:
+                writer.write(
+                    f"HTTP/1.1 {e.status} {HTTPStatus(e.status).phrase}\r\n"
+                    "content-length: 0\r\nconnection: close\r\n\r\n".encode('latin-1')
+                )
+                await writer.drain()
+                break
+            if request is None:
+                break
+            method, target, version, headers = request
+
+            path, _, query_string = target.partition('?')
+            status, response_headers, body = await app.respond(method, unquote(path), query_string, {
+                'HTTP_USER_AGENT': headers.get('user-agent', ''),
+                'HTTP_REFERER': headers.get('referer', ''),
+                'REMOTE_ADDR': remote_addr,
+            })
+
+            connection_header = headers.get('connection', '').lower()
+            keep_alive = (
+                connection_header == 'keep-alive' if version == 'HTTP/1.0'
+                else connection_header != 'close'
+            )
+            head = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n".encode('latin-1')]
+            head.extend(name + b': ' + value + b'\r\n' for name, value in response_headers)
+            head.append(f"content-length: {len(body)}\r\n".encode('latin-1'))
+            head.append(b'connection: keep-alive\r\n\r\n' if keep_alive else b'connection: close\r\n\r\n')
+            writer.write(b''.join(head) + (b'' if method == 'HEAD' else body))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(app, host, port):
+    """Serve until SIGINT/SIGTERM"""
+    app.start()
+    loop = asyncio.get_running_loop()
+    stopped = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopped.set)
+    server = await asyncio.start_server(partial(handle_connection, app), host, port, limit=MAX_LINE_BYTES + 2)
+    logger.info("Redirect server listening on %s:%s", host, port)
+    async with server:
+        await stopped.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Minimal short-code redirect server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(serve(application, args.host, args.port))
+    finally:
+        # Writes any queued clicks before exiting
+        application.stop()
+
+
+if __name__ == '__main__':
+    main()
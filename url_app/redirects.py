@@ -0,0 +1,76 @@
+# url_app/redirects.py
+"""
+Redirect path shared by RedirectView and redirect-only nodes.
+
+Only Django core, the redirect cache and the click ingest functions are
+imported here, so a node running ``shortner.settings_redirect`` serves
+redirects without loading DRF, serializers or templates.
+"""
+import json
+
+from django.db.models import F
+from django.http import HttpResponse, HttpResponseRedirect
+
+from .analytics import build_click_event, record_click
+from .cache import get_redirect_target
+from .models import URL
+
+ALLOWED_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# What DRF's SimpleMetadata reports for RedirectView under the default
+# renderer and parser settings
+OPTIONS_METADATA = {
+    'name': 'Redirect',
+    'description': 'Handle redirects from short codes',
+    'renders': ['application/json', 'text/html'],
+    'parses': ['application/json']
+}
+
+
+def gone_payload(target):
+    """Response body for an expired or inactive link"""
+    return {
+        'error': 'Link expired or inactive',
+        'original_url': target.original_url,
+        'expired_at': target.expires_at.isoformat(),
+        'status': 'expired'
+    }
+
+
+def count_click(url_id, meta):
+    """Increment the click count and track analytics for one redirect"""
+    URL.objects.filter(pk=url_id).update(click_count=F('click_count') + 1)
+    try:
+        record_click(build_click_event(url_id, meta))
+    except Exception as e:
+        print(f"Analytics tracking error: {e}")
+
+
+def json_response(data, status):
+    """Render ``data`` the way DRF's JSONRenderer does"""
+    body = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return HttpResponse(body, content_type='application/json', status=status)
+
+
+def redirect_view(request, short_code):
+    """Plain Django redirect view, with the same responses as RedirectView"""
+    response = _respond(request, short_code)
+    # APIView lists the allowed methods on every response
+    response['Allow'] = ', '.join(ALLOWED_METHODS)
+    return response
+
+
+def _respond(request, short_code):
+    if request.method not in ALLOWED_METHODS:
+        return json_response({'detail': f'Method "{request.method}" not allowed.'}, 405)
+    if request.method == 'OPTIONS':
+        return json_response(OPTIONS_METADATA, 200)
+
+    target = get_redirect_target(short_code)
+    if target is None:
+        return json_response({'detail': 'Not found.'}, 404)
+
+    if target.is_expired or not target.is_active:
+        return json_response(gone_payload(target), 410)
+
+    count_click(target.pk, request.META)
+    return HttpResponseRedirect(target.original_url)
@@ -0,0 +1,603 @@
+# url_app/segments.py
+"""
+Append-only columnar segment files for click events.
+
+Each segment holds a batch of click events stored column by column,
+with rows sorted by URL id. Every column is split into zlib-compressed
+groups of GROUP_ROWS rows: timestamps are delta-encoded, and string
+columns are encoded as small integer codes into a dictionary kept per
+row group. A small index of the URL ids in the segment and the rows
+they span is kept in memory, so a query for one URL skips segments
+without its rows and only decodes the row groups holding them. Decoded
+groups are kept in a bounded LRU cache; segment files never change, so
+cached groups never go stale.
+
+Segments are written once and never modified. A background thread
+compacts segments of similar size into one larger segment whose header
+lists the segments it replaces; readers ignore replaced segments, so
+they see each click once even before the old files are removed.
+
+File layout::
+
+    MAGIC | header length (uint32 LE) | JSON header | column blocks...
+"""
+import fcntl
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'CLKSEG1\x00'
+HEADER_LENGTH = struct.Struct('<I')
+SEGMENT_SUFFIX = '.seg'
+LOCK_NAME = '.compact.lock'
+COMPRESSION_LEVEL = 6
+VERSION = 2
+GROUP_ROWS = 4096
+BLOCK_CACHE_BYTES = 64 * 1024 * 1024
+
+DICTIONARY_COLUMNS = (
+    'ip_address', 'user_agent', 'referrer', 'country', 'city',
+    'device_type', 'browser', 'operating_system'
+)
+
+
+def _to_millis(value):
+    return int(value.timestamp() * 1000)
+
+
+def _from_millis(value):
+    return datetime.fromtimestamp(value / 1000, tz=dt_timezone.utc)
+
+
+def _code_dtype(size):
+    """Smallest unsigned integer type able to index a dictionary"""
+    if size <= np.iinfo(np.uint8).max:
+        return np.uint8
+    if size <= np.iinfo(np.uint16).max:
+        return np.uint16
+    return np.uint32
+
+
+def _positions(rows):
+    """Row numbers selected by a slice or index array"""
+    if isinstance(rows, slice):
+        return np.arange(rows.start, rows.stop)
+    return np.asarray(rows)
+
+
+def _url_index(url_ids):
+    """Distinct URL ids of a sorted column and the row bounds of each"""
+    ids, starts = np.unique(url_ids, return_index=True)
+    return ids, np.append(starts, len(url_ids)).astype(np.int64)
+
+
+class BlockCache:
+    """Thread-safe LRU of decoded blocks, bounded by their size in bytes"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, load):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[0]
+        value, size = load()
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (value, size)
+                self.size += size
+            while self.size > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+block_cache = BlockCache(BLOCK_CACHE_BYTES)
+
+
+class ColumnReader:
+    """Row selection and decoding shared by in-memory batches and segments"""
+
+    def rows(self, url_id):
+        """Rows holding clicks for ``url_id`` as a slice, or None"""
+        i = np.searchsorted(self.url_ids, url_id)
+        if i == len(self.url_ids) or self.url_ids[i] != url_id:
+            return None
+        return slice(int(self.url_bounds[i]), int(self.url_bounds[i + 1]))
+
+    def column(self, name):
+        return self.values(name, slice(0, len(self)))
+
+    def timestamps(self, rows=None):
+        """Absolute click times in milliseconds since the epoch"""
+        return self.values('clicked_at', slice(0, len(self)) if rows is None else rows)
+
+    def labels(self, name, rows):
+        """Decoded values of a dictionary column"""
+        result = [None] * len(_positions(rows))
+        for indices, codes, labels in self._label_groups(name, rows):
+            for i, code in zip(indices, codes):
+                result[i] = labels[code]
+        return result
+
+    def label_counts(self, name, rows):
+        """Count the rows per value of a dictionary column"""
+        counter = Counter()
+        for _, codes, labels in self._label_groups(name, rows):
+            counts = np.bincount(codes, minlength=len(labels))
+            for code in np.flatnonzero(counts):
+                counter[labels[code]] += int(counts[code])
+        return counter
+
+    def events(self, rows):
+        """Decode rows back into event dicts"""
+        events = [
+            {'url_id': int(url_id), 'clicked_at': _from_millis(int(ms))}
+            for url_id, ms in zip(self.values('url_id', rows), self.timestamps(rows))
+        ]
+        for name in DICTIONARY_COLUMNS:
+            for event, label in zip(events, self.labels(name, rows)):
+                event[name] = label
+        return events
+
+
+class EncodedBatch(ColumnReader):
+    """Column arrays and dictionaries for a batch of click events"""
+
+    def __init__(self, columns, dictionaries):
+        # clicked_at holds absolute milliseconds; it is delta-encoded on write
+        self.columns = columns
+        self.dictionaries = dictionaries
+        self.url_ids, self.url_bounds = _url_index(columns['url_id'])
+
+    @classmethod
+    def from_events(cls, events):
+        # Stable sort, so each URL's clicks keep their arrival order
+        events = sorted(events, key=lambda e: e['url_id'])
+        columns = {
+            'url_id': np.array([e['url_id'] for e in events], dtype=np.int64),
+            'clicked_at': np.array([_to_millis(e['clicked_at']) for e in events], dtype=np.int64),
+        }
+        dictionaries = {}
+        for name in DICTIONARY_COLUMNS:
+            index = {}
+            codes = [index.setdefault(e.get(name), len(index)) for e in events]
+            columns[name] = np.array(codes, dtype=_code_dtype(len(index)))
+            dictionaries[name] = list(index)
+        return cls(columns, dictionaries)
+
+    def __len__(self):
+        return len(self.columns['url_id'])
+
+    @classmethod
+    def concat(cls, readers):
+        """Merge batches or segments column by column, keeping rows sorted by URL id"""
+        columns = {name: np.concatenate([reader.column(name) for reader in readers])
+                   for name in ('url_id', 'clicked_at')}
+        dictionaries = {}
+        for name in DICTIONARY_COLUMNS:
+            index = {}
+            codes = np.concatenate([reader.encode(name, index) for reader in readers])
+            columns[name] = codes.astype(_code_dtype(len(index)))
+            dictionaries[name] = list(index)
+        # Stable, so each URL's clicks keep the order of the merged readers
+        order = np.argsort(columns['url_id'], kind='stable')
+        return cls({name: values[order] for name, values in columns.items()}, dictionaries)
+
+    def values(self, name, rows):
+        return self.columns[name][rows]
+
+    def encode(self, name, index):
+        """Codes of a whole dictionary column in a merged ``index`` (label -> code)"""
+        remap = np.array([index.setdefault(label, len(index)) for label in self.dictionaries[name]], dtype=np.uint32)
+        return remap[self.columns[name]]
+
+    def _label_groups(self, name, rows):
+        codes = self.columns[name][rows]
+        yield range(len(codes)), codes, self.dictionaries[name]
+
+    def write(self, path, replaces=()):
+        """Write the batch as a segment file, atomically replacing ``path``"""
+        blocks = []
+        offset = 0
+        base_ms = int(self.columns['clicked_at'].min()) if len(self) else 0
+        header = {
+            'version': VERSION,
+            'rows': len(self),
+            'group_rows': GROUP_ROWS,
+            'base_ms': base_ms,
+            'replaces': list(replaces),
+            'columns': {},
+            'index': {},
+        }
+
+        def add(data):
+            nonlocal offset
+            block = zlib.compress(data, COMPRESSION_LEVEL)
+            blocks.append(block)
+            offset += len(block)
+            return [offset - len(block), len(block)]
+
+        for name, values in self.columns.items():
+            meta = {'dtype': values.dtype.str, 'groups': []}
+            if name in self.dictionaries:
+                # Each row group gets its own, smaller dictionary
+                meta.update(dtypes=[], labels=[])
+            for start in range(0, len(values), GROUP_ROWS):
+                group = values[start:start + GROUP_ROWS]
+                if name == 'clicked_at':
+                    group = np.diff(group, prepend=base_ms)
+                elif name in self.dictionaries:
+                    used, group = np.unique(group, return_inverse=True)
+                    group = group.astype(_code_dtype(len(used)))
+                    labels = [self.dictionaries[name][code] for code in used]
+                    meta['dtypes'].append(group.dtype.str)
+                    meta['labels'].append(add(json.dumps(labels).encode('utf-8')))
+                meta['groups'].append(add(group.tobytes()))
+            header['columns'][name] = meta
+        for name, values in (('url_ids', self.url_ids), ('url_bounds', self.url_bounds)):
+            block_offset, length = add(values.tobytes())
+            header['index'][name] = {'offset': block_offset, 'length': length, 'dtype': values.dtype.str}
+
+        header_bytes = json.dumps(header).encode('utf-8')
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(HEADER_LENGTH.pack(len(header_bytes)))
+            f.write(header_bytes)
+            for block in blocks:
+                f.write(block)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+
+class Segment(ColumnReader):
+    """
+    Read-only view of a segment file.
+
+    The header and URL index stay in memory; row groups are read from the
+    file when first needed, so no file descriptor is held between reads.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not a click segment file: {path}")
+            (header_length,) = HEADER_LENGTH.unpack(f.read(HEADER_LENGTH.size))
+            self.header = json.loads(f.read(header_length))
+        if self.header['version'] != VERSION:
+            raise ValueError(f"Unsupported click segment version: {path}")
+        self._data_offset = len(MAGIC) + HEADER_LENGTH.size + header_length
+        self.base_ms = self.header['base_ms']
+        self.replaces = self.header['replaces']
+        self.group_rows = self.header['group_rows']
+        index = self.header['index']
+        self.url_ids = self._array(index['url_ids'])
+        self.url_bounds = self._array(index['url_bounds'])
+
+    def __len__(self):
+        return self.header['rows']
+
+    def _block(self, offset, length):
+        with open(self.path, 'rb') as f:
+            f.seek(self._data_offset + offset)
+            return zlib.decompress(f.read(length))
+
+    def _array(self, meta):
+        return np.frombuffer(self._block(meta['offset'], meta['length']), dtype=np.dtype(meta['dtype']))
+
+    def _read_group(self, name, group):
+        meta = self.header['columns'][name]
+        offset, length = meta['groups'][group]
+        dtype = meta['dtypes'][group] if name in DICTIONARY_COLUMNS else meta['dtype']
+        values = np.frombuffer(self._block(offset, length), dtype=np.dtype(dtype))
+        if name == 'clicked_at':
+            values = self.base_ms + np.cumsum(values)
+        return values
+
+    def _read_labels(self, name, group):
+        offset, length = self.header['columns'][name]['labels'][group]
+        return json.loads(self._block(offset, length))
+
+    def _group(self, name, group):
+        def load():
+            values = self._read_group(name, group)
+            return values, values.nbytes
+        return block_cache.get((self.path, name, group), load)
+
+    def _group_labels(self, name, group):
+        def load():
+            labels = self._read_labels(name, group)
+            return labels, sum(len(label or '') for label in labels) + 8 * len(labels)
+        return block_cache.get((self.path, name, 'labels', group), load)
+
+    def _group_count(self):
+        return len(self.header['columns']['url_id']['groups'])
+
+    def column(self, name):
+        # Whole-column reads are for compaction; they bypass the block cache
+        parts = [self._read_group(name, group) for group in range(self._group_count())]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.dtype(self.header['columns'][name]['dtype']))
+
+    def encode(self, name, index):
+        """Codes of a whole dictionary column in a merged ``index`` (label -> code)"""
+        parts = [np.empty(0, dtype=np.uint32)]
+        for group in range(self._group_count()):
+            labels = self._read_labels(name, group)
+            remap = np.array([index.setdefault(label, len(index)) for label in labels], dtype=np.uint32)
+            parts.append(remap[self._read_group(name, group)])
+        return np.concatenate(parts)
+
+    def _by_group(self, rows):
+        """Yield ``(group, indices into rows, row numbers within the group)``"""
+        positions = _positions(rows)
+        groups = positions // self.group_rows
+        if len(groups) and groups[0] == groups[-1]:
+            # Common case: the rows of one URL fall in a single group
+            group = int(groups[0])
+            yield group, range(len(positions)), positions - group * self.group_rows
+            return
+        for group in np.unique(groups):
+            indices = np.flatnonzero(groups == group)
+            yield int(group), indices, positions[indices] - group * self.group_rows
+
+    def values(self, name, rows):
+        result = np.empty(len(_positions(rows)), dtype=np.dtype(self.header['columns'][name]['dtype']))
+        for group, indices, local in self._by_group(rows):
+            result[indices] = self._group(name, group)[local]
+        return result
+
+    def _label_groups(self, name, rows):
+        for group, indices, local in self._by_group(rows):
+            yield indices, self._group(name, group)[local], self._group_labels(name, group)
+
+
+class SegmentStore:
+    """
+    Per-process writer and query layer over a directory of segments.
+
+    Events are buffered in memory and flushed to a new segment once
+    ``flush_rows`` events are pending, or by a background thread once
+    the oldest pending event is ``flush_interval`` seconds old. After a
+    flush the same thread merges ``compact_threshold`` segments of one
+    size tier (within a factor of ``compact_threshold`` in rows, below
+    ``compact_rows``), so each click is rewritten only once per tier and
+    never on the request path. Queries read every live segment in the
+    directory plus this process's pending buffer.
+    """
+
+    def __init__(self, directory, flush_rows=1000, flush_interval=5.0,
+                 compact_threshold=16, compact_rows=100000):
+        self.directory = str(directory)
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.compact_threshold = compact_threshold
+        self.compact_rows = compact_rows
+        self._pending = []
+        self._pending_since = None
+        self._segments = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._flusher_pid = None
+        self._compact_due = False
+        self._closed = False
+        os.makedirs(self.directory, exist_ok=True)
+
+    def append(self, event):
+        self.extend([event])
+
+    def extend(self, events):
+        with self._lock:
+            if not self._pending:
+                self._pending_since = time.monotonic()
+                self._wake.set()
+            self._pending.extend(events)
+            due = len(self._pending) >= self.flush_rows
+            self._start_flusher()
+        if due:
+            self.flush()
+
+    def _start_flusher(self):
+        """Start this process's flush thread (called with the lock held)"""
+        if self._flusher_pid == os.getpid() or self._closed:
+            return
+        self._flusher_pid = os.getpid()
+        threading.Thread(target=self._run_flusher, name='click-segments', daemon=True).start()
+
+    def _run_flusher(self):
+        while not self._closed:
+            with self._lock:
+                since = self._pending_since
+            timeout = self.flush_interval if since is None else since + self.flush_interval - time.monotonic()
+            if timeout > 0 and not self._compact_due:
+                self._wake.wait(timeout)
+                self._wake.clear()
+                continue
+            try:
+                if timeout <= 0:
+                    self.flush()
+                if self._compact_due:
+                    self._compact_due = False
+                    self.compact()
+            except Exception:
+                logger.exception("Click segment maintenance failed")
+
+    def flush(self):
+        """Write pending events to a new segment file"""
+        with self._lock:
+            events, self._pending = self._pending, []
+            self._pending_since = None
+        if not events:
+            return None
+        path = self._write(EncodedBatch.from_events(events))
+        if self.compact_threshold:
+            self._compact_due = True
+            self._wake.set()
+        return path
+
+    def _write(self, batch, replaces=()):
+        name = f"clicks-{time.time_ns():020d}-{os.getpid()}{SEGMENT_SUFFIX}"
+        path = os.path.join(self.directory, name)
+        batch.write(path, replaces)
+        return path
+
+    def segments(self):
+        """Open (and cache) every live segment currently in the directory"""
+        names = sorted(n for n in os.listdir(self.directory) if n.endswith(SEGMENT_SUFFIX))
+        segments = []
+        for name in names:
+            segment = self._segments.get(name)
+            if segment is None:
+                try:
+                    segment = Segment(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    # Removed by a compaction since the listing
+                    continue
+            segments.append(segment)
+        self._segments = {segment.name: segment for segment in segments}
+        replaced = {name for segment in segments for name in segment.replaces}
+        return [segment for segment in segments if segment.name not in replaced]
+
+    def _tier(self, rows):
+        base = max(self.compact_threshold, 2)
+        tier = 0
+        while rows >= base:
+            rows //= base
+            tier += 1
+        return tier
+
+    def _compaction_candidates(self):
+        small = [s for s in self.segments() if len(s) < self.compact_rows]
+        if not self.compact_threshold:
+            return small
+        tiers = {}
+        for segment in small:
+            tiers.setdefault(self._tier(len(segment)), []).append(segment)
+        ready = [tiers[tier] for tier in sorted(tiers) if len(tiers[tier]) >= self.compact_threshold]
+        return ready[0] if ready else []
+
+    def compact(self):
+        """
+        Merge the smallest size tier holding ``compact_threshold``
+        segments into one segment, or every segment smaller than
+        ``compact_rows`` when the threshold is 0. Returns the new
+        segment's path, or None when there was nothing to merge or
+        another process is compacting.
+        """
+        with open(os.path.join(self.directory, LOCK_NAME), 'a') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None
+            try:
+                self._remove_replaced()
+                small = self._compaction_candidates()
+                if len(small) < 2:
+                    return None
+                path = self._write(EncodedBatch.concat(small), replaces=[segment.name for segment in small])
+                self._remove_replaced()
+                return path
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _remove_replaced(self):
+        """Delete segment files that a compacted segment has replaced"""
+        self.segments()
+        live = set(self._segments)
+        for segment in list(self._segments.values()):
+            for name in segment.replaces:
+                if name in live:
+                    try:
+                        os.unlink(os.path.join(self.directory, name))
+                    except FileNotFoundError:
+                        pass
+
+    def total_size(self):
+        return sum(os.path.getsize(s.path) for s in self.segments())
+
+    def _batches(self):
+        batches = list(self.segments())
+        with self._lock:
+            pending = list(self._pending)
+        if pending:
+            batches.append(EncodedBatch.from_events(pending))
+        return batches
+
+    def stats(self, url_id, now, days=7, recent=20):
+        """
+        Aggregate clicks for one URL, mirroring the row-table stats:
+        clicks per day, device and browser distributions and the most
+        recent clicks (newest first).
+        """
+        for attempt in range(3):
+            try:
+                return self._stats(url_id, now, days, recent)
+            except FileNotFoundError:
+                # A compaction replaced a segment mid-scan; its rows are
+                # in the compacted segment, so scan again
+                if attempt == 2:
+                    raise
+
+    def _stats(self, url_id, now, days, recent):
+        today = _to_millis(now) // 86_400_000
+        day_counts = np.zeros(days, dtype=np.int64)
+        devices = Counter()
+        browsers = Counter()
+        candidates = []
+
+        for batch in self._batches():
+            rows = batch.rows(url_id)
+            if rows is None:
+                continue
+            timestamps = batch.timestamps(rows)
+
+            age = today - timestamps // 86_400_000
+            day_counts += np.bincount(age[(age >= 0) & (age < days)], minlength=days)
+
+            for name, counter in (('device_type', devices), ('browser', browsers)):
+                for label, count in batch.label_counts(name, rows).items():
+                    counter[label or 'Unknown'] += count
+
+            newest = np.argsort(timestamps, kind='stable')[-recent:]
+            candidates.extend(batch.events(_positions(rows)[newest]))
+
+        candidates.sort(key=lambda event: event['clicked_at'], reverse=True)
+        clicks_by_day = {
+            (now - timedelta(days=i)).date().isoformat(): int(day_counts[i])
+            for i in range(days)
+        }
+        return {
+            'clicks_by_day': clicks_by_day,
+            'device_distribution': dict(devices),
+            'browser_distribution': dict(browsers),
+            'recent_clicks': candidates[:recent],
+        }
+
+    def close(self):
+        """Stop the flush thread; pending events are left to the caller to flush"""
+        self._closed = True
+        self._wake.set()
+        self._segments = {}
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import URL, ClickAnalytics
+from .batch import MAX_ITEMS, OPERATIONS
 from datetime import timedelta
 from django.utils import timezone
 import secrets
@@ -14,12 +15,12 @@ class URLSerializer(serializers.ModelSerializer):
         model = URL
         fields = [
             'id', 'short_code', 'original_url', 
-            'short_url', 'stats_url', 'admin_hash',
+            'short_url', 'stats_url',
             'created_at', 'expires_at', 'days_remaining',
             'click_count', 'is_active'
         ]
         read_only_fields = [
-            'id', 'short_code', 'admin_hash', 'created_at',
+            'id', 'short_code', 'created_at',
             'click_count', 'is_active'
         ]
     
@@ -30,14 +31,49 @@ class URLSerializer(serializers.ModelSerializer):
         return f"/{obj.short_code}"
     
     def get_stats_url(self, obj):
+        # Only the digest is stored, so the key comes from the caller
         request = self.context.get('request')
+        admin_key = self.context.get('admin_key', '')
         if request:
-            return f"{request.scheme}://{request.get_host()}/api/urls/{obj.short_code}/stats/?admin_key={obj.admin_hash}"
-        return f"/api/urls/{obj.short_code}/stats/?admin_key={obj.admin_hash}"
+            return f"{request.scheme}://{request.get_host()}/api/urls/{obj.short_code}/stats/?admin_key={admin_key}"
+        return f"/api/urls/{obj.short_code}/stats/?admin_key={admin_key}"
     
     def get_days_remaining(self, obj):
         return obj.days_remaining
 
+class URLListSerializer(serializers.ModelSerializer):
+    """Serializer for URL listings (never exposes the admin key)"""
+    short_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = URL
+        fields = [
+            'id', 'short_code', 'original_url', 'host', 'short_url',
+            'created_at', 'expires_at', 'click_count', 'is_active'
+        ]
+    
+    def get_short_url(self, obj):
+        request = self.context.get('request')
+        if request:
+            return f"{request.scheme}://{request.get_host()}/{obj.short_code}"
+        return f"/{obj.short_code}"
+
+class URLListQuerySerializer(serializers.Serializer):
+    """Query parameters for listing URLs"""
+    status = serializers.ChoiceField(
+        choices=['active', 'expired', 'inactive'],
+        required=False,
+        help_text="Only active, expired or deactivated links"
+    )
+    min_clicks = serializers.IntegerField(required=False, min_value=0)
+    max_clicks = serializers.IntegerField(required=False, min_value=0)
+    host = serializers.CharField(required=False, help_text="Exact destination host, e.g. example.com")
+    cursor = serializers.CharField(required=False)
+    page_size = serializers.IntegerField(required=False, min_value=1, max_value=200)
+    
+    def validate_host(self, value):
+        return value.strip().lower()
+
 class URLCreateSerializer(serializers.Serializer):
     """Serializer for creating URLs"""
     url = serializers.URLField(required=True)
@@ -56,22 +92,56 @@ class URLCreateSerializer(serializers.Serializer):
         original_url = validated_data['url']
         expires_in = validated_data.get('expires_in', 30)
         
-        # Generate unique admin hash
-        admin_hash = secrets.token_urlsafe(32)
+        # Generate the admin key; only its digest is stored
+        admin_key = secrets.token_urlsafe(32)
         
         # Create URL with expiration
         expires_at = timezone.now() + timedelta(days=expires_in)
         
-        url_obj = URL.objects.create(
-            original_url=original_url,
-            admin_hash=admin_hash,
-            expires_at=expires_at
-        )
+        url_obj = URL(original_url=original_url, expires_at=expires_at)
+        url_obj.set_admin_key(admin_key)
+        url_obj.save()
         
+        # Returned to the creator once, never stored
+        url_obj.admin_key = admin_key
         return url_obj
 
+class BatchItemSerializer(serializers.Serializer):
+    """One short code and its admin key"""
+    code = serializers.CharField(max_length=10)
+    admin_key = serializers.CharField()
+
+class BatchOperationSerializer(serializers.Serializer):
+    """Serializer for batch management requests"""
+    operation = serializers.ChoiceField(choices=OPERATIONS)
+    items = BatchItemSerializer(many=True, allow_empty=False, max_length=MAX_ITEMS)
+    expires_in = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=365,
+        help_text="New expiration in days from now (extend only)"
+    )
+    
+    def validate_items(self, items):
+        codes = [item['code'] for item in items]
+        if len(set(codes)) != len(codes):
+            raise serializers.ValidationError('Each code may appear only once per batch.')
+        return items
+    
+    def validate(self, data):
+        if data['operation'] == 'extend' and 'expires_in' not in data:
+            raise serializers.ValidationError({'expires_in': 'This field is required for extend.'})
+        return data
+
 class ClickAnalyticsSerializer(serializers.ModelSerializer):
     """Serializer for analytics data"""
+    # Dimension rows render as their string value (plain strings pass through)
+    user_agent = serializers.CharField(read_only=True)
+    referrer = serializers.CharField(read_only=True)
+    device_type = serializers.CharField(read_only=True)
+    browser = serializers.CharField(read_only=True)
+    operating_system = serializers.CharField(read_only=True)
+    
     class Meta:
         model = ClickAnalytics
         fields = [
@@ -0,0 +1,20 @@
+# url_app/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate
+from .models import URL
+from .snapshot import record_deletions
+
+
+@receiver(post_save, sender=URL)
+@receiver(post_delete, sender=URL)
+def invalidate_redirect_cache(sender, instance, **kwargs):
+    """Drop the cached redirect target whenever a URL changes"""
+    invalidate(instance.short_code)
+
+
+@receiver(post_delete, sender=URL)
+def record_tombstone(sender, instance, **kwargs):
+    """Let snapshot lookups in every process see the deletion"""
+    record_deletions([instance.short_code])
@@ -0,0 +1,261 @@
+# url_app/snapshot.py
+"""
+Read-only snapshot file of active short codes.
+
+``export_snapshot`` writes every active, non-expired URL into one file
+that redirect workers memory-map and search without touching the
+database. Changes made after the export are picked up by a small
+overlay: every refresh reads the URLs whose ``updated_at`` moved and the
+tombstones of deleted codes since the previous refresh, and those
+entries take precedence over the file. Tombstones are only written
+while ``REDIRECT_SNAPSHOT_PATH`` is set, and those older than the
+snapshot being replaced are pruned by the next export.
+
+File layout::
+
+    header | string heap (UTF-8 URLs) | index (fixed-size records sorted by code)
+
+Each index record holds the code padded to 10 bytes, the offset and
+length of its URL in the heap, the expiry time and the URL id, so a
+lookup is a binary search over the index plus one heap slice. Replacing
+the file is atomic and workers pick it up without restarting; exports
+should run often enough to keep the overlay small.
+"""
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models.functions import Collate
+from django.utils import timezone
+
+from .cache import FIELDS, RedirectTarget
+from .models import URL, URLTombstone
+
+MAGIC = b'URLSNAP1'
+VERSION = 2
+CODE_SIZE = 10
+# magic, version, record count, created at (ms), index offset
+HEADER = struct.Struct('<8sIIqq')
+# code, URL offset in heap, URL length, expires at (ms), URL id
+RECORD = struct.Struct(f'<{CODE_SIZE}s2xIIqq')
+# Overlay refreshes re-read this much history, so changes committed by
+# transactions that started before the previous refresh are not missed
+CHANGE_WINDOW = timedelta(seconds=10)
+# Overlay entry for a deleted code
+DELETED = object()
+
+
+def _to_millis(value):
+    return int(value.timestamp() * 1000)
+
+
+def _from_millis(value):
+    return datetime.fromtimestamp(value / 1000, tz=dt_timezone.utc)
+
+
+def export_snapshot(path, chunk_size=10000):
+    """
+    Write a snapshot of all active, non-expired URLs to ``path``,
+    atomically replacing any previous snapshot. Returns the record count.
+    """
+    now = timezone.now()
+    rows = (
+        URL.objects.filter(is_active=True, expires_at__gt=now)
+        .order_by(Collate('short_code', 'C'))
+        .values_list('short_code', 'original_url', 'expires_at', 'pk')
+    )
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    try:
+        previous = Snapshot(path).created_at
+    except (FileNotFoundError, ValueError):
+        previous = None
+    count = 0
+    heap_size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.snapshot-')
+    try:
+        with os.fdopen(fd, 'wb') as f, tempfile.TemporaryFile() as index:
+            f.write(b'\0' * HEADER.size)
+            for short_code, original_url, expires_at, pk in rows.iterator(chunk_size=chunk_size):
+                code = short_code.encode('utf-8')
+                data = original_url.encode('utf-8')
+                if len(code) > CODE_SIZE:
+                    continue
+                if heap_size + len(data) > 0xFFFFFFFF:
+                    raise ValueError("Snapshot string heap exceeds 4 GiB")
+                index.write(RECORD.pack(code, heap_size, len(data), _to_millis(expires_at), pk))
+                f.write(data)
+                heap_size += len(data)
+                count += 1
+
+            index.seek(0)
+            while True:
+                block = index.read(1024 * 1024)
+                if not block:
+                    break
+                f.write(block)
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, VERSION, count, _to_millis(now), HEADER.size + heap_size))
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    if previous is not None:
+        # Workers still on the previous file only read tombstones newer than it
+        URLTombstone.objects.filter(deleted_at__lt=previous - CHANGE_WINDOW).delete()
+    return count
+
+
+def record_deletions(short_codes):
+    """
+    Write tombstones for deleted codes so snapshot overlays drop them.
+    Nothing is recorded while snapshots are not in use, as only the
+    export prunes the table.
+    """
+    if not settings.REDIRECT_SNAPSHOT_PATH or not short_codes:
+        return
+    URLTombstone.objects.bulk_create([URLTombstone(short_code=code) for code in short_codes])
+
+
+class Snapshot:
+    """Memory-mapped snapshot file"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, created_ms, self._index = HEADER.unpack_from(self._mm)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a URL snapshot file: {path}")
+        self.created_at = _from_millis(created_ms)
+
+    def __len__(self):
+        return self.count
+
+    def get(self, short_code):
+        """Binary search the index for ``short_code``"""
+        key = short_code.encode('utf-8')
+        if len(key) > CODE_SIZE:
+            return None
+        key = key.ljust(CODE_SIZE, b'\0')
+        mm = self._mm
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = self._index + mid * RECORD.size
+            if mm[offset:offset + CODE_SIZE] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == self.count:
+            return None
+        code, url_offset, url_length, expires_ms, pk = RECORD.unpack_from(mm, self._index + lo * RECORD.size)
+        if code != key:
+            return None
+        start = HEADER.size + url_offset
+        original_url = mm[start:start + url_length].decode('utf-8')
+        return RedirectTarget(pk, original_url, _from_millis(expires_ms), True)
+
+
+class SnapshotLookup:
+    """
+    Per-process view of the current snapshot plus the overlay of codes
+    created, changed or deleted since it was exported.
+
+    The snapshot file is re-checked every ``check_interval`` seconds and
+    swapped in when it has been replaced; the overlay is refreshed at
+    most every ``overlay_interval`` seconds with two indexed range
+    queries. When more than ``overlay_size`` codes have changed, lookups
+    fall back to the cache and database until the next export.
+    """
+
+    def __init__(self, path, check_interval=1.0, overlay_interval=1.0, overlay_size=100000):
+        self.path = path
+        self.check_interval = check_interval
+        self.overlay_interval = overlay_interval
+        self.overlay_size = overlay_size
+        self.snapshot = None
+        self._overlay = {}
+        self._overlay_since = None
+        self._overflowed = False
+        self._next_check = 0
+        self._next_overlay = 0
+        self._lock = threading.Lock()
+
+    def get(self, short_code):
+        """Return the target for ``short_code``, or None if not covered"""
+        now = time.monotonic()
+        if now >= self._next_check or now >= self._next_overlay:
+            self._refresh(now)
+        if self._overflowed:
+            return None
+        target = self._overlay.get(short_code)
+        if target is DELETED:
+            return None
+        if target is None and self.snapshot is not None:
+            target = self.snapshot.get(short_code)
+        return target
+
+    def _refresh(self, now):
+        # Only one thread refreshes; the others keep using the current state
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            if now >= self._next_check:
+                self._next_check = now + self.check_interval
+                self._reload()
+            if self.snapshot is not None and not self._overflowed and now >= self._next_overlay:
+                self._next_overlay = now + self.overlay_interval
+                self._refresh_overlay()
+        finally:
+            self._lock.release()
+
+    def _reload(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if self.snapshot is not None and self.snapshot.identity == (stat.st_ino, stat.st_mtime_ns, stat.st_size):
+            return
+        # The previous mapping is left to the garbage collector so lookups
+        # still running against it are not cut off
+        snapshot = Snapshot(self.path)
+        self.snapshot = snapshot
+        self._overlay = {}
+        self._overlay_since = snapshot.created_at - CHANGE_WINDOW
+        self._overflowed = False
+        self._next_overlay = 0
+
+    def _refresh_overlay(self):
+        started = timezone.now()
+        since = self._overlay_since
+        deleted = list(
+            URLTombstone.objects.filter(deleted_at__gt=since)
+            .values_list('short_code', flat=True)[:self.overlay_size + 1]
+        )
+        rows = list(
+            URL.objects.filter(updated_at__gt=since)
+            .values_list('short_code', *FIELDS)[:self.overlay_size + 1]
+        )
+        overlay = dict(self._overlay)
+        overlay.update((code, DELETED) for code in deleted)
+        # A deleted row is gone from the URL table, so rows found here
+        # (including re-created codes) are current and win over tombstones
+        overlay.update((row[0], RedirectTarget(*row[1:])) for row in rows)
+        if len(overlay) > self.overlay_size:
+            self._overlay = {}
+            self._overflowed = True
+            return
+        self._overlay = overlay
+        self._overlay_since = started - CHANGE_WINDOW
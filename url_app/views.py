@@ -1,24 +1,78 @@
-from django.shortcuts import render
-
 from rest_framework import viewsets, status
-from rest_framework.decorators import api_view, action
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.shortcuts import get_object_or_404, redirect
-from django.http import HttpResponseRedirect
+from django.shortcuts import get_object_or_404
+from django.http import Http404, HttpResponseRedirect
 from django.utils import timezone
-from datetime import datetime, timedelta
-import validators
 
-from .models import URL, ClickAnalytics
+from .models import URL
+from .analytics import get_click_stats
+from .batch import delete_urls, run_batch
+from .cache import get_redirect_target
+from .pagination import KeysetPagination
+from .redirects import count_click, gone_payload
 from .serializers import (
     URLSerializer, URLCreateSerializer, 
-    URLStatsSerializer, ClickAnalyticsSerializer
+    URLStatsSerializer, ClickAnalyticsSerializer,
+    URLListSerializer, URLListQuerySerializer, BatchOperationSerializer
 )
 
+def get_administered_url(queryset, short_code, admin_key):
+    """Look a URL up by short code and check its admin key, or raise Http404"""
+    url_obj = get_object_or_404(queryset, short_code=short_code)
+    if not url_obj.check_admin_key(admin_key):
+        raise Http404
+    return url_obj
+
 class URLViewSet(viewsets.ViewSet):
 
     
+    def get_permissions(self):
+        # Listing spans every link, so it is limited to staff users
+        if self.action == 'list':
+            return [IsAdminUser()]
+        return super().get_permissions()
+    
+    def list(self, request):
+        """List URLs newest first, with keyset (cursor) pagination"""
+        query = URLListQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        
+        queryset = URL.objects.all()
+        now = timezone.now()
+        if params.get('status') == 'active':
+            queryset = queryset.filter(is_active=True, expires_at__gt=now)
+        elif params.get('status') == 'expired':
+            queryset = queryset.filter(expires_at__lte=now)
+        elif params.get('status') == 'inactive':
+            queryset = queryset.filter(is_active=False)
+        if 'min_clicks' in params:
+            queryset = queryset.filter(click_count__gte=params['min_clicks'])
+        if 'max_clicks' in params:
+            queryset = queryset.filter(click_count__lte=params['max_clicks'])
+        if params.get('host'):
+            queryset = queryset.filter(host=params['host'])
+        
+        paginator = KeysetPagination()
+        rows, next_cursor = paginator.paginate_queryset(
+            queryset, params.get('cursor'), params.get('page_size')
+        )
+        
+        next_url = None
+        if next_cursor:
+            next_params = request.query_params.copy()
+            next_params['cursor'] = next_cursor
+            next_url = request.build_absolute_uri(f"{request.path}?{next_params.urlencode()}")
+        
+        return Response({
+            'results': URLListSerializer(rows, many=True, context={'request': request}).data,
+            'next_cursor': next_cursor,
+            'next': next_url
+        })
+    
     def create(self, request):
         """Create a new short URL"""
         serializer = URLCreateSerializer(data=request.data)
@@ -28,8 +82,8 @@ class URLViewSet(viewsets.ViewSet):
             # Build response data
             response_data = {
                 'short_url': f"{request.scheme}://{request.get_host()}/{url_obj.short_code}",
-                'stats_url': f"{request.scheme}://{request.get_host()}/api/urls/{url_obj.short_code}/stats/?admin_key={url_obj.admin_hash}",
-                'admin_key': url_obj.admin_hash,
+                'stats_url': f"{request.scheme}://{request.get_host()}/api/urls/{url_obj.short_code}/stats/?admin_key={url_obj.admin_key}",
+                'admin_key': url_obj.admin_key,
                 'expires_in': serializer.validated_data.get('expires_in', 30),
                 'expires_at': url_obj.expires_at.isoformat(),
                 'short_code': url_obj.short_code
@@ -51,41 +105,19 @@ class URLViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        url_obj = get_object_or_404(URL, short_code=short_code, admin_hash=admin_key)
+        url_obj = get_administered_url(URL.objects.all(), short_code, admin_key)
         
         # Get analytics data
-        clicks = url_obj.clicks.all()
-        
-        # Calculate clicks by day (last 7 days)
-        clicks_by_day = {}
-        for i in range(7):
-            date = (timezone.now() - timedelta(days=i)).date()
-            count = clicks.filter(clicked_at__date=date).count()
-            clicks_by_day[date.isoformat()] = count
-        
-        # Device distribution
-        device_distribution = {}
-        for click in clicks:
-            device = click.device_type or 'Unknown'
-            device_distribution[device] = device_distribution.get(device, 0) + 1
-        
-        # Browser distribution
-        browser_distribution = {}
-        for click in clicks:
-            browser = click.browser or 'Unknown'
-            browser_distribution[browser] = browser_distribution.get(browser, 0) + 1
-        
-        # Recent clicks
-        recent_clicks = clicks.order_by('-clicked_at')[:20]
+        click_stats = get_click_stats(url_obj)
         
         # Build response
         stats_data = {
-            'url_info': URLSerializer(url_obj, context={'request': request}).data,
+            'url_info': URLSerializer(url_obj, context={'request': request, 'admin_key': admin_key}).data,
             'total_clicks': url_obj.click_count,
-            'clicks_by_day': clicks_by_day,
-            'device_distribution': device_distribution,
-            'browser_distribution': browser_distribution,
-            'recent_clicks': ClickAnalyticsSerializer(recent_clicks, many=True).data
+            'clicks_by_day': click_stats['clicks_by_day'],
+            'device_distribution': click_stats['device_distribution'],
+            'browser_distribution': click_stats['browser_distribution'],
+            'recent_clicks': ClickAnalyticsSerializer(click_stats['recent_clicks'], many=True).data
         }
         
         return Response(stats_data)
@@ -102,7 +134,10 @@ class URLViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        url_obj = get_object_or_404(URL, short_code=short_code, admin_hash=admin_key)
+        url_obj = get_administered_url(
+            URL.objects.only('pk', 'short_code', 'original_url', 'admin_hash'),
+            short_code, admin_key
+        )
         
         # Store info before deleting
         deleted_info = {
@@ -111,8 +146,8 @@ class URLViewSet(viewsets.ViewSet):
             'deleted_at': timezone.now().isoformat()
         }
         
-        # Delete the URL
-        url_obj.delete()
+        # Delete the URL and its clicks without loading them
+        delete_urls({url_obj.short_code: url_obj.pk})
         
         return Response({
             'success': True,
@@ -120,89 +155,45 @@ class URLViewSet(viewsets.ViewSet):
             'deleted_url': deleted_info
         })
 
+    @action(detail=False, methods=['post'], url_path='batch')
+    def batch(self, request):
+        """Extend, activate, deactivate or delete many URLs at once"""
+        serializer = BatchOperationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        data = serializer.validated_data
+        results = run_batch(
+            data['operation'],
+            [(item['code'], item['admin_key']) for item in data['items']],
+            expires_in=data.get('expires_in')
+        )
+        
+        return Response({
+            'operation': data['operation'],
+            'processed': len(results),
+            'succeeded': sum(1 for result in results if result['status'] == 'ok'),
+            'results': results
+        })
+
 class RedirectView(APIView):
     """Handle redirects from short codes"""
     
     def get(self, request, short_code):
         """Redirect to original URL"""
-        url_obj = get_object_or_404(URL, short_code=short_code)
+        target = get_redirect_target(short_code)
+        if target is None:
+            raise Http404
         
         # Check if expired
-        if url_obj.is_expired or not url_obj.is_active:
-            return Response({
-                'error': 'Link expired or inactive',
-                'original_url': url_obj.original_url,
-                'expired_at': url_obj.expires_at.isoformat(),
-                'status': 'expired'
-            }, status=status.HTTP_410_GONE)
-        
-        # Increment click count
-        url_obj.click_count += 1
-        url_obj.save()
+        if target.is_expired or not target.is_active:
+            return Response(gone_payload(target), status=status.HTTP_410_GONE)
         
-        # Track analytics
-        self._track_analytics(url_obj, request)
+        # Increment click count and track analytics
+        count_click(target.pk, request.META)
         
         # Return redirect
-        return HttpResponseRedirect(url_obj.original_url)
-    
-    def _track_analytics(self, url_obj, request):
-        """Track click analytics"""
-        try:
-            user_agent = request.META.get('HTTP_USER_AGENT', '')
-            ip_address = request.META.get('REMOTE_ADDR', '')
-            referrer = request.META.get('HTTP_REFERER', '')
-            
-            # Simple device/browser detection
-            device_type = 'desktop'
-            browser = 'Unknown'
-            os = 'Unknown'
-            
-            if 'Mobile' in user_agent:
-                device_type = 'mobile'
-            elif 'Tablet' in user_agent:
-                device_type = 'tablet'
-            
-            browser_mapping = {
-                'Chrome': 'Chrome',
-                'Firefox': 'Firefox',
-                'Safari': 'Safari',
-                'Edge': 'Edge',
-                'Opera': 'Opera'
-            }
-            
-            for key, value in browser_mapping.items():
-                if key in user_agent:
-                    browser = value
-                    break
-            
-            os_mapping = {
-                'Windows': 'Windows',
-                'Mac': 'macOS',
-                'Linux': 'Linux',
-                'Android': 'Android',
-                'iPhone': 'iOS',
-                'iPad': 'iOS'
-            }
-            
-            for key, value in os_mapping.items():
-                if key in user_agent:
-                    os = value
-                    break
-            
-            ClickAnalytics.objects.create(
-                url=url_obj,
-                ip_address=ip_address,
-                user_agent=user_agent[:500],  
-                referrer=referrer[:500] if referrer else None,
-                device_type=device_type,
-                browser=browser,
-                operating_system=os,
-                country='Unknown',  
-                city='Unknown'
-            )
-        except Exception as e:
-            print(f"Analytics tracking error: {e}")
+        return HttpResponseRedirect(target.original_url)
 
 class APIDocsView(APIView):
     """Simple API documentation endpoint"""
@@ -237,6 +228,32 @@ class APIDocsView(APIView):
                         'admin_key': 'string (required) - Admin key from creation'
                     }
                 },
+                'live_clicks': {
+                    'method': 'GET',
+                    'url': '/api/urls/live/?code=<short_code>&admin_key=<admin_key>',
+                    'description': 'Server-Sent Events stream of clicks as they happen (ASGI only)',
+                    'parameters': {
+                        'code': 'string (required) - The short code',
+                        'admin_key': 'string (required) - Admin key from creation'
+                    },
+                    'events': {
+                        'click': 'One click (same fields as recent_clicks)',
+                        'tick': 'Every second: clicks and dropped since the last tick, total since connecting'
+                    }
+                },
+                'list_urls': {
+                    'method': 'GET',
+                    'url': '/api/urls/?status=active&min_clicks=10&host=example.com',
+                    'description': 'List URLs newest first (staff only), paginated with next_cursor',
+                    'parameters': {
+                        'status': 'string (optional) - active, expired or inactive',
+                        'min_clicks': 'integer (optional) - Minimum click count',
+                        'max_clicks': 'integer (optional) - Maximum click count',
+                        'host': 'string (optional) - Exact destination host',
+                        'cursor': 'string (optional) - next_cursor from the previous page',
+                        'page_size': 'integer (optional) - Results per page (default: 50, max: 200)'
+                    }
+                },
                 'delete_url': {
                     'method': 'DELETE',
                     'url': '/api/urls/delete/?code=<short_code>&admin_key=<admin_key>',
@@ -246,6 +263,19 @@ class APIDocsView(APIView):
                         'admin_key': 'string (required) - Admin key from creation'
                     }
                 },
+                'batch': {
+                    'method': 'POST',
+                    'url': '/api/urls/batch/',
+                    'description': 'Extend, activate, deactivate or delete many URLs at once',
+                    'request_body': {
+                        'operation': 'string (required) - extend, activate, deactivate or delete',
+                        'items': 'list (required) - Up to 10000 objects with code and admin_key, each code at most once',
+                        'expires_in': 'integer (extend only) - New expiration in days from now'
+                    },
+                    'response': {
+                        'results': 'list - One {code, status} per item, status is ok, not_found or error'
+                    }
+                },
                 'redirect': {
                     'method': 'GET',
                     'url': '/<short_code>',
@@ -0,0 +1,131 @@
+# url_app/warmup.py
+"""
+Warm a worker before it serves traffic: open the database connection,
+preload the most clicked active URLs into the redirect cache and fill
+the dimension id caches used by click ingest.
+
+The top-N query walks the partial ``url_active_clicks_idx`` index, so a
+worker boot reads about ``top_n`` rows instead of sorting the table. On
+PostgreSQL the queries run under a statement timeout matching the time
+budget. The share of all clicks covered by the cached URLs needs a full
+scan, so it is only computed when asked for (``manage.py warm_cache``),
+never on worker boot.
+"""
+import logging
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DatabaseError, OperationalError, connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from . import cache
+from .models import URL, Browser, DeviceType, OperatingSystem, Referrer, UserAgent
+
+logger = logging.getLogger(__name__)
+
+DIMENSION_MODELS = (UserAgent, Referrer, DeviceType, Browser, OperatingSystem)
+
+# Report of the most recent warm-up in this process
+last_report = None
+
+
+@contextmanager
+def _query_budget(deadline):
+    """Cancel queries still running at ``deadline`` (PostgreSQL only)"""
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            timeout_ms = max(int((deadline - time.monotonic()) * 1000), 1)
+            with connection.cursor() as cursor:
+                # SET LOCAL ends with the transaction (or savepoint) around it
+                cursor.execute("SELECT set_config('statement_timeout', %s, true)", [str(timeout_ms)])
+        yield
+
+
+def warm_up(top_n=None, time_budget=None, chunk_size=500, coverage=False):
+    """
+    Run every warm-up step within ``time_budget`` seconds and return a
+    report with the duration of each step. With ``coverage`` the report
+    also has the share of all clicks covered by the cached URLs.
+    """
+    global last_report
+    top_n = settings.REDIRECT_WARMUP_TOP_N if top_n is None else top_n
+    time_budget = settings.REDIRECT_WARMUP_TIME_BUDGET if time_budget is None else time_budget
+    start = time.monotonic()
+    deadline = start + time_budget
+
+    report = {
+        'top_n': top_n,
+        'time_budget': time_budget,
+        'budget_exhausted': False,
+        'urls_loaded': 0,
+        'clicks_covered': 0,
+        'clicks_total': None,
+        'coverage': None,
+        'dimensions_loaded': 0,
+    }
+
+    connection.ensure_connection()
+    report['connect_seconds'] = time.monotonic() - start
+
+    now = timezone.now()
+    active = URL.objects.filter(is_active=True, expires_at__gt=now)
+    rows = active.order_by('-click_count').values_list(
+        'short_code', 'pk', 'original_url', 'expires_at', 'is_active', 'click_count'
+    )[:top_n]
+    try:
+        with _query_budget(deadline):
+            chunk = []
+            for row in rows.iterator(chunk_size=chunk_size):
+                chunk.append(row)
+                if len(chunk) == chunk_size:
+                    _preload(chunk, report)
+                    chunk = []
+                    if time.monotonic() >= deadline:
+                        report['budget_exhausted'] = True
+                        break
+            if chunk:
+                _preload(chunk, report)
+
+            for model in DIMENSION_MODELS:
+                if time.monotonic() >= deadline:
+                    report['budget_exhausted'] = True
+                    break
+                report['dimensions_loaded'] += model.objects.preload(model.objects.cache_size)
+
+            if coverage and time.monotonic() < deadline:
+                report['clicks_total'] = active.aggregate(total=Sum('click_count'))['total'] or 0
+                if report['clicks_total']:
+                    report['coverage'] = report['clicks_covered'] / report['clicks_total']
+    except OperationalError:
+        # The statement timeout cancelled a query
+        report['budget_exhausted'] = True
+    if time.monotonic() >= deadline:
+        report['budget_exhausted'] = True
+
+    report['duration_seconds'] = time.monotonic() - start
+    last_report = report
+    logger.info(
+        "Warm-up finished in %.3fs: %d URLs cached (coverage %s), %d dimension values%s",
+        report['duration_seconds'], report['urls_loaded'],
+        'n/a' if report['coverage'] is None else f"{report['coverage']:.1%}",
+        report['dimensions_loaded'],
+        ' (time budget exhausted)' if report['budget_exhausted'] else ''
+    )
+    return report
+
+
+def _preload(rows, report):
+    cache.preload((row[:5] for row in rows), settings.REDIRECT_WARMUP_CACHE_TIMEOUT)
+    report['urls_loaded'] += len(rows)
+    report['clicks_covered'] += sum(row[5] for row in rows)
+
+
+def warm_up_on_startup():
+    """Warm-up hook for AppConfig.ready(); never prevents a worker from booting"""
+    try:
+        return warm_up()
+    except DatabaseError as e:
+        logger.warning("Warm-up skipped: %s", e)
+        return None